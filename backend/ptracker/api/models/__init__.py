@@ -1,9 +1,11 @@
 from ._associations import PromiseActionLink
 from .action import Action, ActionCreate, ActionPublic, ActionsPublic, ActionUpdate
+from .cache import ResponseCacheStats
 from .candidate import Candidate, CandidateCreate, CandidatePublic, CandidatesPublic, CandidateUpdate
 from .promise import Promise, PromiseCreate, PromisePublic, PromisesPublic, PromiseUpdate
 from .citation import Citation, CitationCreate, CitationPublic, CitationsPublic, CitationUpdate
-from .source import SourceRequest, SourceResponse
+from .job import ExtractionJob, ExtractionJobPublic
+from .source import ProcessedChunk, SourceArticle, SourceRequest, SourceResponse
 
 # Resolve a few tricky types for Pydantic directly.
 PromiseCreate.model_rebuild()
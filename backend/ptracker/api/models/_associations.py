@@ -1,6 +1,9 @@
-from sqlmodel import SQLModel, Field
+from sqlmodel import Index, SQLModel, Field
 
 
 class PromiseActionLink(SQLModel, table=True):
+    # The primary key pages through an action's promises; this pages through a promise's actions.
+    __table_args__ = (Index("ix_promiseactionlink_promise_id_action_id", "promise_id", "action_id"),)
+
     action_id: int = Field(foreign_key="action.id", primary_key=True)
     promise_id: int = Field(foreign_key="promise.id", primary_key=True)
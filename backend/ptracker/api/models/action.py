@@ -1,6 +1,7 @@
 from datetime import datetime
 from pgvector.sqlalchemy import Vector
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy.orm import deferred
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 from typing import Any, Optional
 
 from ptracker.api.models._associations import PromiseActionLink
@@ -24,13 +25,25 @@ class ActionUpdate(SQLModel):
     text: Optional[str] = None
 
 
+_action_embedding = Column("embedding", Vector(settings.ACTION_EMBEDDING_DIM))
+
+
 class Action(ActionBase, table=True):
+    # Keyset pagination of a candidate's actions.
+    __table_args__ = (Index("ix_action_candidate_id_id", "candidate_id", "id"),)
+    # Embeddings are only compared inside the database, so they aren't loaded with every action; query with
+    # `undefer(Action.embedding)` to load them.
+    __mapper_args__ = {"properties": {"embedding": deferred(_action_embedding)}}
+
     id: int = Field(default=None, primary_key=True)
     candidate_id: int = Field(foreign_key="candidate.id", ondelete="CASCADE")
     candidate: "Candidate" = Relationship(back_populates="actions")  # noqa: F821
     citations: list["Citation"] = Relationship(back_populates="action", cascade_delete=True)  # noqa: F821
     promises: list["Promise"] = Relationship(back_populates="actions", link_model=PromiseActionLink)  # noqa: F821
-    embedding: Any = Field(default=None, sa_column=Column(Vector(settings.ACTION_EMBEDDING_DIM)))
+    embedding: Any = Field(default=None, sa_column=_action_embedding)
+    # Counters are kept exact by database triggers; see ptracker.core.counters.
+    citation_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    promise_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
 
 class ActionPublic(ActionBase):
@@ -43,3 +56,5 @@ class ActionPublic(ActionBase):
 class ActionsPublic(SQLModel):
     data: list[ActionPublic] = Field(description="List of action jsons.")
     count: int = Field(description="Total number of actions tracked for this candidate.")
+    next_cursor: Optional[str] = Field(default=None,
+                                       description="Pass as `cursor` to fetch the next page; null on the last page.")
@@ -0,0 +1,10 @@
+from sqlmodel import Field, SQLModel
+
+
+class ResponseCacheStats(SQLModel):
+    hits: int = Field(description="Reads served from the response cache.")
+    misses: int = Field(description="Reads that had to be rendered, since no current response was cached.")
+    not_modified: int = Field(description="Reads answered with 304 Not Modified, whether cached or not.")
+    evictions: int = Field(description="Responses evicted to keep the cache within its size limit.")
+    entries: int = Field(description="Responses currently cached.")
+    size: int = Field(description="Bytes of response bodies currently cached.")
@@ -1,5 +1,5 @@
 from pydantic import HttpUrl, field_validator
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Column, Field, JSON, Relationship, SQLModel, text
 from typing import Optional
 
 
@@ -17,6 +17,8 @@ class CandidateBase(SQLModel):
 
 class CandidateCreate(CandidateBase):
     profile_image_url: Optional[HttpUrl]
+    aliases: list[str] = Field(default_factory=list,
+                               description="Other names the candidate goes by, e.g. a nickname or maiden name.")
 
     @field_validator("profile_image_url")
     @classmethod
@@ -29,6 +31,7 @@ class CandidateUpdate(SQLModel):
     name: Optional[str] = Field(default=None, min_length=2, max_length=128)
     description: Optional[str] = Field(default=None, max_length=500)
     profile_image_url: Optional[HttpUrl] = None
+    aliases: Optional[list[str]] = None
 
     @field_validator("profile_image_url")
     @classmethod
@@ -42,6 +45,11 @@ class Candidate(CandidateBase, table=True):
     promises: list["Promise"] = Relationship(back_populates="candidate", cascade_delete=True)  # noqa: F821
     actions: list["Action"] = Relationship(back_populates="candidate", cascade_delete=True)  # noqa: F821
     profile_image_url: Optional[str] = None
+    aliases: list[str] = Field(default_factory=list,
+                               sa_column=Column(JSON, nullable=False, server_default=text("'[]'")))
+    # Counters are kept exact by database triggers; see ptracker.core.counters.
+    promise_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    action_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
 
 class CandidatePublic(CandidateBase):
@@ -49,8 +57,11 @@ class CandidatePublic(CandidateBase):
     promises: int = Field(description="Number of promises tracked for this candidate.")
     actions: int = Field(description="Number of actions associated with this candidate.")
     profile_image_url: Optional[str] = None
+    aliases: list[str] = Field(description="Other names the candidate goes by, e.g. a nickname or maiden name.")
 
 
 class CandidatesPublic(SQLModel):
     data: list[CandidatePublic] = Field(description="List of candidate jsons.")
     count: int = Field(description="Total number of candidates in the database.")
+    next_cursor: Optional[str] = Field(default=None,
+                                       description="Pass as `cursor` to fetch the next page; null on the last page.")
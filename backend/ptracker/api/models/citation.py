@@ -1,6 +1,6 @@
 from datetime import datetime
 from pydantic import HttpUrl, model_validator
-from sqlmodel import Field, Relationship, SQLModel
+from sqlmodel import Field, Index, Relationship, SQLModel
 from typing import Optional
 
 from ptracker.core.settings import settings
@@ -29,6 +29,12 @@ class CitationCreate(SQLModel):
 
 
 class Citation(CitationBase, table=True):
+    # Keyset pagination of a promise's or action's citations.
+    __table_args__ = (
+        Index("ix_citation_promise_id_id", "promise_id", "id"),
+        Index("ix_citation_action_id_id", "action_id", "id"),
+    )
+
     id: int = Field(default=None, primary_key=True)
     promise: Optional["Promise"] = Relationship(back_populates="citations")  # noqa: F821
     action: Optional["Action"] = Relationship(back_populates="citations")  # noqa: F821
@@ -43,6 +49,8 @@ class CitationPublic(CitationBase):
 class CitationsPublic(SQLModel):
     data: list[CitationPublic] = Field(description="List of citation jsons.")
     count: int = Field(description="Total number of citations associated with this promise.")
+    next_cursor: Optional[str] = Field(default=None,
+                                       description="Pass as `cursor` to fetch the next page; null on the last page.")
 
 
 class CitationUpdate(SQLModel):
@@ -0,0 +1,39 @@
+from datetime import datetime
+from sqlmodel import Column, Field, JSON, SQLModel, text
+from typing import Optional
+
+from ptracker.core.constants import PromiseExtractionPhase
+
+
+class ExtractionJobBase(SQLModel):
+    candidate_id: int = Field(foreign_key="candidate.id", ondelete="CASCADE")
+    status: str = Field(default=PromiseExtractionPhase.QUEUED, index=True)
+    attempts: int = Field(default=0, description="Number of times a worker has leased this job.")
+    error: Optional[str] = Field(default=None, description="Error from the most recent failed attempt, if any.")
+    chunk_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"},
+                             description="Chunks of text in the processed urls.")
+    skipped_chunk_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"},
+                                     description="Chunks the relevance filter kept from the LLM, as not being about "
+                                                 "the candidate.")
+
+
+class ExtractionJob(ExtractionJobBase, table=True):
+    id: int = Field(default=None, primary_key=True)
+    urls: list[str] = Field(sa_column=Column(JSON, nullable=False))
+    processed_urls: list[str] = Field(default_factory=list, sa_column=Column(JSON, nullable=False))
+    failed_urls: dict[str, str] = Field(default_factory=dict,
+                                        sa_column=Column(JSON, nullable=False, server_default=text("'{}'")))
+    lease_owner: Optional[str] = None
+    lease_expires_at: Optional[datetime] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+    updated_at: datetime = Field(default_factory=datetime.now)
+
+
+class ExtractionJobPublic(ExtractionJobBase):
+    id: int
+    urls: list[str]
+    processed_urls: list[str] = Field(description="Urls whose entities have already been committed.")
+    failed_urls: dict[str, str] = Field(description="Urls that could not be fetched or parsed, with the reason; "
+                                                    "retries skip them.")
+    created_at: datetime
+    updated_at: datetime
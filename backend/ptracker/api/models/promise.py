@@ -1,6 +1,7 @@
 from datetime import datetime
 from pgvector.sqlalchemy import Vector
-from sqlmodel import Column, Field, Relationship, SQLModel
+from sqlalchemy.orm import deferred
+from sqlmodel import Column, Field, Index, Relationship, SQLModel
 from typing import Any, Optional
 
 from ptracker.api.models._associations import PromiseActionLink
@@ -26,13 +27,25 @@ class PromiseUpdate(SQLModel):
     text: Optional[str] = Field(default=None, min_length=1)
 
 
+_promise_embedding = Column("embedding", Vector(settings.PROMISE_EMBEDDING_DIM))
+
+
 class Promise(PromiseBase, table=True):
+    # Keyset pagination of a candidate's promises.
+    __table_args__ = (Index("ix_promise_candidate_id_id", "candidate_id", "id"),)
+    # Embeddings are only compared inside the database, so they aren't loaded with every promise; query with
+    # `undefer(Promise.embedding)` to load them.
+    __mapper_args__ = {"properties": {"embedding": deferred(_promise_embedding)}}
+
     id: int = Field(default=None, primary_key=True)
     candidate_id: int = Field(foreign_key="candidate.id", ondelete="CASCADE")
     candidate: "Candidate" = Relationship(back_populates="promises")  # noqa: F821
     actions: list["Action"] = Relationship(back_populates="promises", link_model=PromiseActionLink)  # noqa: F821
     citations: list["Citation"] = Relationship(back_populates="promise", cascade_delete=True)  # noqa: F821
-    embedding: Any = Field(default=None, sa_column=Column(Vector(settings.PROMISE_EMBEDDING_DIM)))
+    embedding: Any = Field(default=None, sa_column=_promise_embedding)
+    # Counters are kept exact by database triggers; see ptracker.core.counters.
+    citation_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
+    action_count: int = Field(default=0, sa_column_kwargs={"server_default": "0"})
 
     def timestamp(self) -> str:
         return self._timestamp.strftime("%Y-%m-%d")
@@ -48,3 +61,5 @@ class PromisePublic(PromiseBase):
 class PromisesPublic(SQLModel):
     data: list[PromisePublic] = Field(description="List of promise jsons.")
     count: int = Field(description="Total number of promises tracked for this candidate.")
+    next_cursor: Optional[str] = Field(default=None,
+                                       description="Pass as `cursor` to fetch the next page; null on the last page.")
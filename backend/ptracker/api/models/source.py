@@ -1,5 +1,7 @@
-from pydantic import BaseModel, HttpUrl, Field
-from typing import Literal
+from datetime import datetime
+from pydantic import BaseModel, HttpUrl
+from sqlmodel import BigInteger, Column, Field, SQLModel, UniqueConstraint
+from typing import Literal, Optional
 
 
 class SourceRequest(BaseModel):
@@ -7,4 +9,36 @@ class SourceRequest(BaseModel):
 
 
 class SourceResponse(BaseModel):
-    status: Literal["started", "failed"]
+    status: Literal["queued", "started", "complete", "failed"]
+    job_id: Optional[int] = Field(default=None, description="ID of the extraction job processing these sources.")
+
+
+class SourceArticle(SQLModel, table=True):
+    # Every article a candidate's entities have been extracted from, fingerprinted so that syndicated copies of it
+    # can be recognized and cited without being extracted again.
+    id: int = Field(default=None, primary_key=True)
+    candidate_id: int = Field(foreign_key="candidate.id", ondelete="CASCADE", index=True)
+    url: str
+    fingerprint: int = Field(sa_column=Column(BigInteger, nullable=False),
+                             description="64-bit SimHash of the article text, stored as a signed integer.")
+    canonical_id: Optional[int] = Field(default=None, foreign_key="sourcearticle.id", ondelete="CASCADE",
+                                        description="The article this one is a near-duplicate of, if any.")
+    # Validators for conditional GETs, only worth sending while the extractors are unchanged since the last fetch.
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    extraction_version: Optional[str] = None
+    created_at: datetime = Field(default_factory=datetime.now)
+
+
+class ProcessedChunk(SQLModel, table=True):
+    # Ledger of the chunks each extractor version has already extracted and committed entities from, so that
+    # re-ingesting a url only pays for chunks that are new, changed, or due for a newer prompt or model.
+    __table_args__ = (UniqueConstraint("candidate_id", "url", "chunk_hash", "extraction_version"),)
+
+    id: int = Field(default=None, primary_key=True)
+    candidate_id: int = Field(foreign_key="candidate.id", ondelete="CASCADE")
+    url: str = Field(index=True)
+    content_hash: str = Field(description="Hash of the whole article text the chunk was cut from.")
+    chunk_hash: str
+    extraction_version: str = Field(description="Hash of the model, prompt and schema the chunk was extracted with.")
+    created_at: datetime = Field(default_factory=datetime.now)
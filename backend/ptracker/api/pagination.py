@@ -0,0 +1,54 @@
+from fastapi import HTTPException
+from sqlmodel import Session
+from sqlmodel.sql.expression import Select, SelectOfScalar
+from typing import Any
+
+import base64
+import binascii
+import json
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))["id"]
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        last_id = None
+    if not isinstance(last_id, int):
+        raise HTTPException(status_code=400, detail=f"Malformed pagination cursor '{cursor}'.")
+    return last_id
+
+
+def paginate(
+        session: Session,
+        query: Select,
+        count_query: SelectOfScalar[int],
+        key: Any,
+        after: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+) -> tuple[list[Any], int, str | None]:
+    """
+    Fetch one page of `query`, ordered by `key` (an id column). With a `cursor` from a previous page, the page starts
+    right after the last row that page returned, which an index on (parent id, `key`) finds without scanning any of
+    the rows before it. Without one, `after` rows are skipped instead, as before cursors existed.
+
+    `query` selects the page's entity first and `count_query`, as a scalar subquery, last; so the total comes back in
+    the same round trip as the page. Returns the page's rows without that last column (just the entities, if that
+    leaves one column), the total, and the cursor for the next page, which is None on the last page.
+    """
+    query = query.order_by(key)
+    if cursor is not None:
+        query = query.where(key > decode_cursor(cursor))
+    else:
+        query = query.offset(after)
+    # One extra row tells whether there is a next page.
+    rows = session.exec(query.limit(limit + 1)).all()
+    # Only a page past the end needs a separate count.
+    count = rows[0][-1] if rows else session.exec(count_query).one()
+    has_next = limit > 0 and len(rows) > limit
+    page = [row[0] if len(row) == 2 else tuple(row[:-1]) for row in rows[:max(limit, 0)]]
+    return page, count, encode_cursor(rows[limit - 1][0].id) if has_next else None
@@ -0,0 +1,175 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from starlette.concurrency import run_in_threadpool
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+from sqlmodel import Session
+
+import hashlib
+import re
+import threading
+
+from ptracker.core.changes import notify_candidate_changed
+from ptracker.core.db import engine
+from ptracker.core.settings import settings
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+_CANDIDATE_PATH = re.compile(rf"^{re.escape(settings.API_VERSION_STRING)}/candidates(?:/(\d+))?(?:/.*)?$")
+_WRITE_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+
+
+@dataclass
+class CachedResponse:
+    version: tuple[int, int]
+    body: bytes
+    content_type: str | None
+    etag: str
+
+
+class ResponseCache:
+    """
+    In-memory LRU cache of GET responses, keyed by path and query. Every entry remembers the version of the data it
+    was rendered from: that of its candidate for routes under /candidates/{candidate_id}, and that of all candidates
+    for the candidate list. A write bumps those versions, which retires every response rendered before it.
+    """
+    def __init__(self, max_bytes: int = settings.RESPONSE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._size = 0
+        # Clearing everything bumps the epoch, so a response rendered before the clear can't be stored after it.
+        self._epoch = 0
+        self._all_candidates_version = 0
+        self._candidate_versions: dict[int, int] = {}
+
+    def version(self, candidate_id: int | None) -> tuple[int, int]:
+        with self._lock:
+            if candidate_id is None:
+                return self._epoch, self._all_candidates_version
+            return self._epoch, self._candidate_versions.get(candidate_id, 0)
+
+    def invalidate(self, candidate_id: int | None) -> None:
+        # None invalidates everything, e.g. after notifications may have been missed.
+        with self._lock:
+            if candidate_id is None:
+                self._epoch += 1
+                self._entries.clear()
+                self._size = 0
+            else:
+                self._candidate_versions[candidate_id] = self._candidate_versions.get(candidate_id, 0) + 1
+            # The candidate list shows every candidate's counts.
+            self._all_candidates_version += 1
+
+    def get(self, key: str, version: tuple[int, int]) -> CachedResponse | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key: str, entry: CachedResponse) -> None:
+        with self._lock:
+            if entry.version[0] != self._epoch or len(entry.body) > self.max_bytes:
+                return
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous.body)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted.body)
+                self.evictions += 1
+
+    def record_not_modified(self) -> None:
+        with self._lock:
+            self.not_modified += 1
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+                "entries": len(self._entries),
+                "size": self._size,
+            }
+
+
+response_cache = ResponseCache()
+
+
+def _etag(body: bytes) -> str:
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("If-None-Match")
+    return if_none_match is not None and (if_none_match.strip() == "*"
+                                          or etag in (tag.strip() for tag in if_none_match.split(",")))
+
+
+def _publish_change(candidate_id: int | None) -> None:
+    with Session(engine) as session:
+        notify_candidate_changed(session, candidate_id)
+        session.commit()
+
+
+class ResponseCacheMiddleware(BaseHTTPMiddleware):
+    """
+    Serves candidate, promise, action and citation reads from `response_cache`, with strong ETags so that a client
+    revalidating an unchanged response gets a 304 without the database being touched. Successful writes invalidate
+    their candidate here and, through Postgres notifications, in every other API process; extraction workers notify
+    the same way when they commit. Extraction job routes change as jobs run, so they are never cached.
+    """
+    def __init__(self, app, cache: ResponseCache = response_cache):
+        super().__init__(app)
+        self.cache = cache
+
+    async def dispatch(self, request: Request, call_next: RequestResponseEndpoint) -> Response:
+        match = _CANDIDATE_PATH.match(request.url.path)
+        if match is None or "/sources" in request.url.path:
+            return await call_next(request)
+        candidate_id = int(match.group(1)) if match.group(1) else None
+
+        if request.method in _WRITE_METHODS:
+            response = await call_next(request)
+            if response.status_code < 400:
+                self.cache.invalidate(candidate_id)
+                try:
+                    await run_in_threadpool(_publish_change, candidate_id)
+                except Exception as e:
+                    logger.warning(f"Failed to notify other processes of a change to {candidate_id=}: {e}")
+            return response
+        if request.method != "GET":
+            return await call_next(request)
+
+        key = request.url.path + "?" + request.url.query
+        version = self.cache.version(candidate_id)
+        entry = self.cache.get(key, version)
+        if entry is None:
+            response = await call_next(request)
+            if response.status_code != 200:
+                return response
+            body = b"".join([chunk async for chunk in response.body_iterator])
+            entry = CachedResponse(version=version, body=body, content_type=response.headers.get("Content-Type"),
+                                   etag=_etag(body))
+            self.cache.set(key, entry)
+
+        headers = {"ETag": entry.etag, "Cache-Control": "no-cache"}
+        if _etag_matches(request, entry.etag):
+            self.cache.record_not_modified()
+            return Response(status_code=304, headers=headers)
+        return Response(content=entry.body, media_type=entry.content_type, headers=headers)
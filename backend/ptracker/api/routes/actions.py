@@ -9,10 +9,12 @@ from ptracker.api.models import (
     ActionPublic,
     ActionsPublic,
     ActionUpdate,
+    Candidate,
     Citation,
     Promise,
     PromiseActionLink,
 )
+from ptracker.api.pagination import paginate
 from ptracker.core import constants
 from ptracker.core.db import SessionArg
 from ptracker.core.llm_utils import get_action_embedding, fetch_promises_by_embedding
@@ -23,15 +25,21 @@ nested_promise_router = APIRouter(prefix="/candidates/{candidate_id}/promises/{p
 
 
 @router.get("/", response_model=ActionsPublic)
-def read_actions(session: SessionArg, candidate_id: int, after: int = 0, limit: int = 100) -> Any:
-    count_query = select(func.count()).select_from(Action).where(Action.candidate_id == candidate_id)
-    count = session.exec(count_query).one()  # one and only one result, else error
-
-    action_query = select(Action).where(Action.candidate_id == candidate_id).offset(after).limit(limit)
-    actions = session.exec(action_query).all()
-    response_actions = _publicize_actions(session, actions)
+def read_actions(
+        session: SessionArg,
+        candidate_id: int,
+        after: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+) -> Any:
+    # Zero for an unknown candidate, rather than no row at all.
+    count_query = select(func.coalesce(func.sum(Candidate.action_count), 0)).where(Candidate.id == candidate_id)
+    action_query = select(Action, count_query.scalar_subquery()).where(Action.candidate_id == candidate_id)
+    actions, count, next_cursor = paginate(session, action_query, count_query, key=Action.id,
+                                           after=after, limit=limit, cursor=cursor)
+    response_actions = _publicize_actions(actions)
 
-    return ActionsPublic(data=response_actions, count=count)
+    return ActionsPublic(data=response_actions, count=count, next_cursor=next_cursor)
 
 
 @nested_promise_router.get("/", response_model=ActionsPublic)
@@ -40,22 +48,20 @@ def read_nested_actions(
         candidate_id: int,
         promise_id: int,
         after: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: str | None = None,
 ) -> Any:
     _validate_promise(session=session, candidate_id=candidate_id, promise_id=promise_id)
 
-    count_query = select(func.count()).select_from(PromiseActionLink).where(PromiseActionLink.promise_id == promise_id)
-    count = session.exec(count_query).one()  # all actions linked with the requested promise
-
-    action_query = (select(Action)
+    count_query = select(Promise.action_count).where(Promise.id == promise_id)
+    action_query = (select(Action, count_query.scalar_subquery())
                     .join(PromiseActionLink)
-                    .where(PromiseActionLink.promise_id == promise_id)
-                    .offset(after)
-                    .limit(limit))
-    actions = session.exec(action_query).all()
-    response_actions = _publicize_actions(session, actions)
+                    .where(PromiseActionLink.promise_id == promise_id))
+    actions, count, next_cursor = paginate(session, action_query, count_query, key=PromiseActionLink.action_id,
+                                           after=after, limit=limit, cursor=cursor)
+    response_actions = _publicize_actions(actions)
 
-    return ActionsPublic(data=response_actions, count=count)
+    return ActionsPublic(data=response_actions, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{action_id}", response_model=ActionPublic)
@@ -66,10 +72,7 @@ def read_action(session: SessionArg, candidate_id: int, action_id: int) -> Any:
         raise HTTPException(status_code=404, detail=f"Action with id={action_id} not found for candidate "
                                                     f"with id={candidate_id}.")
 
-    num_citations = _get_citation_count_helper(session, action.id)
-    num_promises = _get_promise_count_helper(session, action.id)
-    return ActionPublic.model_validate(action, update={"citations": num_citations,
-                                                       "promises": num_promises})
+    return _publicize_action(action)
 
 
 @nested_promise_router.get("/{action_id}")
@@ -138,8 +141,7 @@ def create_action(session: SessionArg, candidate_id: int, action_in: ActionCreat
     session.commit()
     session.refresh(action)
 
-    return ActionPublic.model_validate(action, update={"citations": len(citations),
-                                                       "promises": len(promises)})
+    return _publicize_action(action)
 
 
 @router.patch("/{action_id}", response_model=ActionPublic)
@@ -173,62 +175,24 @@ def update_action(session: SessionArg, candidate_id: int, action_id: int, action
                                                          candidate_id=candidate_id,
                                                          action_embedding=updated_action_embedding)
     seen = {p.id for p in action.promises}
-    num_promises = len(seen)
     for auto_assigned_promise in auto_assigned_promises:
         if auto_assigned_promise.id not in seen:
             action.promises.append(auto_assigned_promise)
-            num_promises += 1
 
     session.add(action)
     session.commit()
     session.refresh(action)
 
-    num_citations = _get_citation_count_helper(session, action.id)
-    return ActionPublic.model_validate(action, update={"citations": num_citations,
-                                                       "promises": num_promises})
-
-
-def _get_citation_count_helper(session: Session, action_id: int) -> int:
-    query = select(func.count()).select_from(Citation).where(Citation.action_id == action_id)
-    num_citations = session.exec(query).one()
-    return num_citations
-
-
-def _get_promise_count_helper(session: Session, action_id: int) -> int:
-    query = select(func.count()).select_from(PromiseActionLink).where(PromiseActionLink.action_id == action_id)
-    num_promises = session.exec(query).one()
-    return num_promises
-
-
-def _publicize_actions(session: Session, actions: list[Action]) -> list[ActionPublic]:
-    action_ids = [a.id for a in actions]
-
-    # Fetch num citations without O(P) database calls
-    citation_action_query = select(Citation.id, Citation.action_id).where(col(Citation.action_id).in_(action_ids))
-    citation_action_tuples = session.exec(citation_action_query).all()
-    ca_map = {}
-    for citation_id, action_id in citation_action_tuples:
-        if action_id not in ca_map:
-            ca_map[action_id] = 0
-        ca_map[action_id] += 1
-
-    # Fetch num promises without O(P) database calls
-    promise_action_query = (select(PromiseActionLink.promise_id, PromiseActionLink.action_id)
-                            .where(col(PromiseActionLink.action_id).in_(action_ids)))
-    promise_action_tuples = session.exec(promise_action_query).all()
-    pa_map = {}
-    for promise_id, action_id in promise_action_tuples:
-        if action_id not in pa_map:
-            pa_map[action_id] = 0
-        pa_map[action_id] += 1
-
-    response_actions = []
-    for action in actions:
-        response_action = ActionPublic.model_validate(action,
-                                                      update={"citations": ca_map.get(action.id, 0),
-                                                              "promises": pa_map.get(action.id, 0)})
-        response_actions.append(response_action)
-    return response_actions
+    return _publicize_action(action)
+
+
+def _publicize_action(action: Action) -> ActionPublic:
+    return ActionPublic.model_validate(action, update={"citations": action.citation_count,
+                                                       "promises": action.promise_count})
+
+
+def _publicize_actions(actions: list[Action]) -> list[ActionPublic]:
+    return [_publicize_action(action) for action in actions]
 
 
 def _validate_promise(session: Session, candidate_id: int, promise_id: int) -> None:
@@ -0,0 +1,13 @@
+from fastapi import APIRouter
+from typing import Any
+
+from ptracker.api.models import ResponseCacheStats
+from ptracker.api.response_cache import response_cache
+
+router = APIRouter(prefix="/cache", tags=["cache"])
+
+
+@router.get("/stats", response_model=ResponseCacheStats)
+def read_cache_stats() -> Any:
+    # Counters of this API process only, since every process keeps its own cache.
+    return ResponseCacheStats(**response_cache.stats())
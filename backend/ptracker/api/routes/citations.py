@@ -1,5 +1,5 @@
 from fastapi import APIRouter, HTTPException
-from sqlmodel import func, select, Session
+from sqlmodel import select, Session
 from typing import cast, Any
 
 from ptracker.api.models import (
@@ -11,6 +11,7 @@ from ptracker.api.models import (
     CitationUpdate,
     Promise
 )
+from ptracker.api.pagination import paginate
 from ptracker.core.db import SessionArg
 
 promise_router = APIRouter(prefix="/candidates/{candidate_id}/promises/{promise_id}/citations", tags=["citations"])
@@ -23,18 +24,18 @@ def read_promise_citations(
         candidate_id: int,
         promise_id: int,
         after: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: str | None = None,
 ) -> Any:
     _validate_promise(session=session, candidate_id=candidate_id, promise_id=promise_id)
 
-    count_query = select(func.count()).select_from(Citation).where(Citation.promise_id == promise_id)
-    count = session.exec(count_query).one()  # one and only one result, else error
-
-    citation_query = select(Citation).where(Citation.promise_id == promise_id).offset(after).limit(limit)
-    citations = session.exec(citation_query).all()
+    count_query = select(Promise.citation_count).where(Promise.id == promise_id)
+    citation_query = select(Citation, count_query.scalar_subquery()).where(Citation.promise_id == promise_id)
+    citations, count, next_cursor = paginate(session, citation_query, count_query, key=Citation.id,
+                                             after=after, limit=limit, cursor=cursor)
 
     response_citations = [CitationPublic.model_validate(citation) for citation in citations]
-    return CitationsPublic(data=response_citations, count=count)
+    return CitationsPublic(data=response_citations, count=count, next_cursor=next_cursor)
 
 
 @promise_router.get("/{citation_id}", response_model=CitationPublic)
@@ -82,17 +83,23 @@ def update_promise_citation(
 
 
 @action_router.get("/", response_model=CitationsPublic)
-def read_action_citations(session: SessionArg, candidate_id: int, action_id: int, after: int = 0, limit: int = 100) -> Any:
+def read_action_citations(
+        session: SessionArg,
+        candidate_id: int,
+        action_id: int,
+        after: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+) -> Any:
     _validate_action(session=session, candidate_id=candidate_id, action_id=action_id)
 
-    count_query = select(func.count()).select_from(Citation).where(Citation.action_id == action_id)
-    count = session.exec(count_query).one()  # one and only one result, else error
-
-    citation_query = select(Citation).where(Citation.action_id == action_id).offset(after).limit(limit)
-    citations = session.exec(citation_query).all()
+    count_query = select(Action.citation_count).where(Action.id == action_id)
+    citation_query = select(Citation, count_query.scalar_subquery()).where(Citation.action_id == action_id)
+    citations, count, next_cursor = paginate(session, citation_query, count_query, key=Citation.id,
+                                             after=after, limit=limit, cursor=cursor)
 
     response_citations = [CitationPublic.model_validate(citation) for citation in citations]
-    return CitationsPublic(data=response_citations, count=count)
+    return CitationsPublic(data=response_citations, count=count, next_cursor=next_cursor)
 
 
 @action_router.get("/{citation_id}", response_model=CitationPublic)
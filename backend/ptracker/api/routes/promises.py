@@ -5,6 +5,7 @@ from typing import Any
 
 from ptracker.api.models import (
     Action,
+    Candidate,
     Citation,
     Promise,
     PromiseActionLink,
@@ -13,6 +14,7 @@ from ptracker.api.models import (
     PromisesPublic,
     PromiseUpdate,
 )
+from ptracker.api.pagination import paginate
 from ptracker.core import constants
 from ptracker.core.db import SessionArg
 from ptracker.core.llm_utils import get_promise_embedding, fetch_actions_by_embedding
@@ -23,15 +25,21 @@ nested_action_router = APIRouter(prefix="/candidates/{candidate_id}/actions/{act
 
 
 @router.get("/", response_model=PromisesPublic)
-def read_promises(session: SessionArg, candidate_id: int, after: int = 0, limit: int = 100) -> Any:
-    count_query = select(func.count()).select_from(Promise).where(Promise.candidate_id == candidate_id)
-    count = session.exec(count_query).one()  # one and only one result, else error
-
-    promise_query = select(Promise).where(Promise.candidate_id == candidate_id).offset(after).limit(limit)
-    promises = session.exec(promise_query).all()
-    response_promises = _publicize_promises(session, promises)
+def read_promises(
+        session: SessionArg,
+        candidate_id: int,
+        after: int = 0,
+        limit: int = 100,
+        cursor: str | None = None,
+) -> Any:
+    # Zero for an unknown candidate, rather than no row at all.
+    count_query = select(func.coalesce(func.sum(Candidate.promise_count), 0)).where(Candidate.id == candidate_id)
+    promise_query = select(Promise, count_query.scalar_subquery()).where(Promise.candidate_id == candidate_id)
+    promises, count, next_cursor = paginate(session, promise_query, count_query, key=Promise.id,
+                                            after=after, limit=limit, cursor=cursor)
+    response_promises = _publicize_promises(promises)
 
-    return PromisesPublic(data=response_promises, count=count)
+    return PromisesPublic(data=response_promises, count=count, next_cursor=next_cursor)
 
 
 @nested_action_router.get("/", response_model=PromisesPublic)
@@ -40,22 +48,20 @@ def read_nested_promises(
         candidate_id: int,
         action_id: int,
         after: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        cursor: str | None = None,
 ) -> Any:
     _validate_action(session=session, candidate_id=candidate_id, action_id=action_id)
 
-    count_query = select(func.count()).select_from(PromiseActionLink).where(PromiseActionLink.action_id == action_id)
-    count = session.exec(count_query).one()  # all promises linked with the requested action
-
-    promise_query = (select(Promise)
+    count_query = select(Action.promise_count).where(Action.id == action_id)
+    promise_query = (select(Promise, count_query.scalar_subquery())
                      .join(PromiseActionLink)
-                     .where(PromiseActionLink.action_id == action_id)
-                     .offset(after)
-                     .limit(limit))
-    promises = session.exec(promise_query).all()
-    response_promises = _publicize_promises(session, promises)
+                     .where(PromiseActionLink.action_id == action_id))
+    promises, count, next_cursor = paginate(session, promise_query, count_query, key=PromiseActionLink.promise_id,
+                                            after=after, limit=limit, cursor=cursor)
+    response_promises = _publicize_promises(promises)
 
-    return PromisesPublic(data=response_promises, count=count)
+    return PromisesPublic(data=response_promises, count=count, next_cursor=next_cursor)
 
 
 @router.get("/{promise_id}", response_model=PromisePublic)
@@ -66,10 +72,7 @@ def read_promise(session: SessionArg, candidate_id: int, promise_id: int) -> Any
         raise HTTPException(status_code=404, detail=f"Promise with id={promise_id} not found for candidate "
                                                     f"with id={candidate_id}.")
 
-    num_citations = _get_citation_count_helper(session, promise.id)
-    num_actions = _get_action_count_helper(session, promise.id)
-    return PromisePublic.model_validate(promise, update={"citations": num_citations,
-                                                         "actions": num_actions})
+    return _publicize_promise(promise)
 
 
 @nested_action_router.get("/{promise_id}")
@@ -138,8 +141,7 @@ def create_promise(session: SessionArg, candidate_id: int, promise_in: PromiseCr
     session.commit()
     session.refresh(promise)
 
-    return PromisePublic.model_validate(promise, update={"citations": len(citations),
-                                                         "actions": len(actions)})
+    return _publicize_promise(promise)
 
 
 @router.patch("/{promise_id}", response_model=PromisePublic)
@@ -173,62 +175,24 @@ def update_promise(session: SessionArg, candidate_id: int, promise_id: int, prom
                                                        candidate_id=candidate_id,
                                                        promise_embedding=updated_promise_embedding)
     seen = {a.id for a in promise.actions}
-    num_actions = len(seen)
     for auto_assigned_action in auto_assigned_actions:
         if auto_assigned_action.id not in seen:
             promise.actions.append(auto_assigned_action)
-            num_actions += 1
 
     session.add(promise)
     session.commit()
     session.refresh(promise)
 
-    num_citations = _get_citation_count_helper(session, promise.id)
-    return PromisePublic.model_validate(promise, update={"citations": num_citations,
-                                                         "actions": num_actions})
-
-
-def _get_citation_count_helper(session: Session, promise_id: int) -> int:
-    query = select(func.count()).select_from(Citation).where(Citation.promise_id == promise_id)
-    num_citations = session.exec(query).one()
-    return num_citations
-
-
-def _get_action_count_helper(session: Session, promise_id: int) -> int:
-    query = select(func.count()).select_from(PromiseActionLink).where(PromiseActionLink.promise_id == promise_id)
-    num_actions = session.exec(query).one()
-    return num_actions
-
-
-def _publicize_promises(session: Session, promises: list[Promise]) -> list[PromisePublic]:
-    promise_ids = [p.id for p in promises]
-
-    # Fetch num citations without O(P) database calls
-    citation_promise_query = select(Citation.id, Citation.promise_id).where(col(Citation.promise_id).in_(promise_ids))
-    citation_promise_tuples = session.exec(citation_promise_query).all()
-    cp_map = {}
-    for citation_id, promise_id in citation_promise_tuples:
-        if promise_id not in cp_map:
-            cp_map[promise_id] = 0
-        cp_map[promise_id] += 1
-
-    # Fetch num actions without O(P) database calls
-    action_promise_query = (select(PromiseActionLink.action_id, PromiseActionLink.promise_id)
-                            .where(col(PromiseActionLink.promise_id).in_(promise_ids)))
-    action_promise_tuples = session.exec(action_promise_query).all()
-    ap_map = {}
-    for action_id, promise_id in action_promise_tuples:
-        if promise_id not in ap_map:
-            ap_map[promise_id] = 0
-        ap_map[promise_id] += 1
-
-    response_promises = []
-    for promise in promises:
-        response_promise = PromisePublic.model_validate(promise,
-                                                        update={"citations": cp_map.get(promise.id, 0),
-                                                                "actions": ap_map.get(promise.id, 0)})
-        response_promises.append(response_promise)
-    return response_promises
+    return _publicize_promise(promise)
+
+
+def _publicize_promise(promise: Promise) -> PromisePublic:
+    return PromisePublic.model_validate(promise, update={"citations": promise.citation_count,
+                                                         "actions": promise.action_count})
+
+
+def _publicize_promises(promises: list[Promise]) -> list[PromisePublic]:
+    return [_publicize_promise(promise) for promise in promises]
 
 
 def _validate_action(session: Session, candidate_id: int, action_id: int) -> None:
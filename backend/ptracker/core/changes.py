@@ -0,0 +1,55 @@
+from sqlmodel import text, Session
+from typing import Callable
+
+import select
+import threading
+
+from ptracker.core.db import engine
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+CHANGES_CHANNEL = "ptracker_candidate_changes"
+_LISTEN_POLL_SECONDS = 5.0
+
+
+def notify_candidate_changed(session: Session, candidate_id: int | None) -> None:
+    """
+    Tell every listening process that a candidate's data changed; None means any data may have. Postgres delivers the
+    notification only once the session's transaction commits, and drops it if the transaction rolls back.
+    """
+    session.exec(text("SELECT pg_notify(:channel, :payload)"),
+                 params={"channel": CHANGES_CHANNEL, "payload": "" if candidate_id is None else str(candidate_id)})
+
+
+def listen_for_changes(on_change: Callable[[int | None], None], stop: threading.Event) -> None:
+    """
+    Call `on_change` with the candidate id of every change notified until `stop` is set. Blocks, so run it on its own
+    thread. Notifications sent while the connection is down are lost, so every (re)connection is reported as a change
+    to any data.
+    """
+    while not stop.is_set():
+        connection = None
+        try:
+            # A dedicated connection, detached from the pool: it sits in LISTEN for as long as the process runs.
+            connection = engine.raw_connection()
+            connection.detach()
+            dbapi_connection = connection.dbapi_connection
+            dbapi_connection.autocommit = True
+            with dbapi_connection.cursor() as cursor:
+                cursor.execute(f"LISTEN {CHANGES_CHANNEL}")
+            on_change(None)
+
+            while not stop.is_set():
+                if not select.select([dbapi_connection], [], [], _LISTEN_POLL_SECONDS)[0]:
+                    continue
+                dbapi_connection.poll()
+                while dbapi_connection.notifies:
+                    payload = dbapi_connection.notifies.pop(0).payload
+                    on_change(int(payload) if payload else None)
+        except Exception as e:
+            logger.warning(f"Lost the connection listening for candidate changes: {e}. Reconnecting shortly.")
+            stop.wait(_LISTEN_POLL_SECONDS)
+        finally:
+            if connection is not None:
+                connection.close()
@@ -9,11 +9,19 @@ class PromiseStatus(Enum):
 
 
 class PromiseExtractionPhase:
-    STARTED = "started"
-    FAILED = "failed"
+    QUEUED = "queued"  # Waiting for a worker to lease it.
+    STARTED = "started"  # Leased by a worker and running.
+    COMPLETE = "complete"
+    FAILED = "failed"  # Ran out of attempts.
 
 
 DUPLICATE_ENTITY_SIM_THRESHOLD = 0.7
 DUPLICATE_ENTITY_DIST_THRESHOLD = 0.3  # 1 - SIM
 PROMISE_ACTION_SIM_THRESHOLD = 0.45
 PROMISE_ACTION_DIST_THRESHOLD = 0.55  # 1 - SIM
+SIMILARITY_BLOCK_SIZE = 1024  # Rows per tile when computing similarity matrices blockwise.
+SIMHASH_SHINGLE_SIZE = 3  # words
+NEAR_DUPLICATE_ARTICLE_DISTANCE = 8  # Max differing bits, out of 64, between SimHashes of near-duplicate articles.
+
+EXTRACTION_MAX_TOKENS = 1200
+CHARS_PER_TOKEN = 4  # Rough average for English text with OpenAI tokenizers.
@@ -0,0 +1,129 @@
+from dataclasses import dataclass
+from lxml import etree, html as lxml_html
+
+import re
+
+from ptracker.core.utils import estimate_tokens
+
+# Not <form>: ASP.NET-style pages wrap their whole body in one, so only its controls go.
+_BOILERPLATE_TAGS = ("script", "style", "noscript", "template", "nav", "footer", "header", "aside", "iframe", "svg",
+                     "button", "select", "input", "textarea", "dialog")
+_BLOCK_TAGS = ("p", "div", "section", "article", "main", "blockquote", "pre", "li", "ul", "ol", "table", "tr",
+               "h1", "h2", "h3", "h4", "h5", "h6", "br", "hr", "figcaption", "dd", "dt")
+# Hints are compared with whole words of an element's class and id, so "commentary" isn't a "comment".
+_NEGATIVE_HINTS = frozenset({
+    "comment", "footer", "sidebar", "widget", "nav", "navbar", "navigation", "menu", "share", "sharing", "social",
+    "promo", "related", "recommend", "recommended", "recommendation", "ad", "advert", "advertisement", "sponsor",
+    "sponsored", "subscribe", "newsletter", "cookie", "banner", "breadcrumb", "popup", "modal", "masthead",
+})
+_POSITIVE_HINTS = frozenset({"article", "body", "content", "entry", "main", "post", "story", "text", "prose"})
+# Words of a class or id, split on separators and camelCase: "articleBody main-content" -> article body main content.
+_HINT_WORD = re.compile(r"[A-Z]?[a-z]+|[A-Z]+(?![a-z])")
+_XML_DECLARATION = re.compile(r"^\s*<\?xml[^>]*\?>")
+_MIN_PARAGRAPH_CHARS = 25
+
+
+@dataclass
+class ContentReport:
+    page_tokens: int  # Tokens in all of the page's text, as we used to send it.
+    content_tokens: int  # Tokens in the extracted article body.
+
+    @property
+    def savings(self) -> float:
+        return 1 - self.content_tokens / self.page_tokens if self.page_tokens else 0.0
+
+
+def normalize_whitespace(text: str) -> str:
+    text = re.sub(r"[^\S\n]+", " ", text)  # Runs of spaces/tabs/nbsp -> one space.
+    text = re.sub(r" ?\n ?", "\n", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)  # At most one blank line between paragraphs.
+    return text.strip()
+
+
+def _hint_words(element: etree._Element) -> set[str]:
+    words = {word.lower() for word in _HINT_WORD.findall(f"{element.get('class', '')} {element.get('id', '')}")}
+    return words | {word[:-1] for word in words if word.endswith("s")}  # Plurals: "comments", "ads".
+
+
+def _class_weight(element: etree._Element) -> float:
+    words = _hint_words(element)
+    weight = 0.0
+    if words & _NEGATIVE_HINTS:
+        weight -= 25
+    if words & _POSITIVE_HINTS:
+        weight += 25
+    return weight
+
+
+def _link_density(element: etree._Element) -> float:
+    text_length = len(element.text_content())
+    if not text_length:
+        return 1.0
+    link_length = sum(len(link.text_content()) for link in element.iter("a"))
+    return link_length / text_length
+
+
+def _block_text(element: etree._Element) -> str:
+    # Give every block-level element its own line, so paragraphs survive text_content()'s concatenation.
+    for block in element.iter(*_BLOCK_TAGS):
+        block.tail = "\n\n" + (block.tail or "")
+    return normalize_whitespace(element.text_content())
+
+
+def _score_candidates(body: etree._Element) -> dict[etree._Element, float]:
+    # Readability-style scoring: every substantial paragraph votes for its parent, and half as much for its
+    # grandparent, with more votes for longer, comma-rich paragraphs.
+    scores: dict[etree._Element, float] = {}
+    for paragraph in body.iter("p", "pre", "td", "blockquote"):
+        text = paragraph.text_content().strip()
+        if len(text) < _MIN_PARAGRAPH_CHARS:
+            continue
+        vote = 1 + text.count(",") + min(len(text) // 100, 3)
+        parent = paragraph.getparent()
+        grandparent = parent.getparent() if parent is not None else None
+        for ancestor, share in ((parent, 1.0), (grandparent, 0.5)):
+            if ancestor is None:
+                continue
+            if ancestor not in scores:
+                scores[ancestor] = _class_weight(ancestor)
+            scores[ancestor] += vote * share
+    return {element: score * (1 - _link_density(element)) for element, score in scores.items()}
+
+
+def extract_main_content(page_html: str) -> tuple[str, ContentReport]:
+    """
+    Strip navigation, footers, scripts and other boilerplate from a page, returning just the article body as
+    whitespace-normalized text, along with a report of how much smaller that is than the page's full text.
+    """
+    try:
+        # lxml refuses str input that declares its own encoding, as XHTML pages do.
+        document = lxml_html.document_fromstring(_XML_DECLARATION.sub("", page_html, count=1))
+    except (etree.ParserError, ValueError):
+        return "", ContentReport(page_tokens=0, content_tokens=0)
+
+    body = document.find("body")
+    if body is None:
+        body = document
+    page_tokens = estimate_tokens(normalize_whitespace(body.text_content()))
+
+    etree.strip_elements(document, etree.Comment, *_BOILERPLATE_TAGS, with_tail=False)
+    for element in list(body.iter("div", "section", "ul", "table")):
+        if _class_weight(element) < 0 and element.getparent() is not None:
+            element.drop_tree()
+
+    scores = _score_candidates(body)
+    if scores:
+        top_candidate = max(scores, key=scores.get)
+        # Siblings that scored nearly as well are usually the rest of a body split across several containers.
+        threshold = max(10.0, scores[top_candidate] * 0.2)
+        parent = top_candidate.getparent()
+        siblings = list(parent) if parent is not None else [top_candidate]
+        content_parts = [
+            _block_text(sibling) for sibling in siblings
+            if sibling is top_candidate or scores.get(sibling, 0) >= threshold
+        ]
+        content = "\n\n".join(part for part in content_parts if part)
+    else:
+        content = _block_text(body)
+
+    return content, ContentReport(page_tokens=page_tokens, content_tokens=estimate_tokens(content))
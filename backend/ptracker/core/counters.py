@@ -0,0 +1,62 @@
+from sqlmodel import text, Session
+
+from ptracker.api.models import Action, Candidate, Citation, Promise, PromiseActionLink
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+# (child, foreign key to parent, parent, counter on parent): each parent row counts the child rows referencing it.
+COUNTERS = [
+    (Promise, "candidate_id", Candidate, "promise_count"),
+    (Action, "candidate_id", Candidate, "action_count"),
+    (Citation, "promise_id", Promise, "citation_count"),
+    (Citation, "action_id", Action, "citation_count"),
+    (PromiseActionLink, "promise_id", Promise, "action_count"),
+    (PromiseActionLink, "action_id", Action, "promise_count"),
+]
+
+
+def install_counter_triggers(session: Session) -> None:
+    """
+    Keep every counter exact from within the database. Children are written through ORM relationships, bulk inserts
+    and cascading deletes alike, and a trigger sees all of them, in the same transaction as the write itself.
+    """
+    for child, foreign_key, parent, counter in COUNTERS:
+        child_table, parent_table = child.__tablename__, parent.__tablename__
+        name = f"count_{child_table}_{foreign_key}"
+        session.exec(text(f"""
+            CREATE OR REPLACE FUNCTION {name}() RETURNS trigger AS $$
+            BEGIN
+                IF TG_OP <> 'INSERT' THEN
+                    UPDATE {parent_table} SET {counter} = {counter} - 1 WHERE id = OLD.{foreign_key};
+                END IF;
+                IF TG_OP <> 'DELETE' THEN
+                    UPDATE {parent_table} SET {counter} = {counter} + 1 WHERE id = NEW.{foreign_key};
+                END IF;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql
+        """))
+        session.exec(text(f"DROP TRIGGER IF EXISTS {name} ON {child_table}"))
+        session.exec(text(f"""
+            CREATE TRIGGER {name}
+            AFTER INSERT OR DELETE OR UPDATE OF {foreign_key} ON {child_table}
+            FOR EACH ROW EXECUTE FUNCTION {name}()
+        """))
+    session.commit()
+
+
+def repair_counters(session: Session) -> None:
+    # Recount every counter from scratch, e.g. for rows written before the triggers existed.
+    for child, foreign_key, parent, counter in COUNTERS:
+        child_table, parent_table = child.__tablename__, parent.__tablename__
+        result = session.exec(text(f"""
+            UPDATE {parent_table} SET {counter} = (
+                SELECT count(*) FROM {child_table} WHERE {child_table}.{foreign_key} = {parent_table}.id
+            )
+            WHERE {counter} IS DISTINCT FROM (
+                SELECT count(*) FROM {child_table} WHERE {child_table}.{foreign_key} = {parent_table}.id
+            )
+        """))
+        logger.info(f"Repaired {parent_table}.{counter} on {result.rowcount} rows.")
+    session.commit()
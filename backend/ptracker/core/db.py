@@ -1,7 +1,7 @@
 from datetime import datetime
 from fastapi import Depends
 from sqlalchemy.engine import Engine
-from sqlalchemy.exc import OperationalError
+from sqlalchemy import inspect
 from sqlmodel import (
     create_engine,
     select,
@@ -12,13 +12,16 @@ from sqlmodel import (
 )
 from typing import Annotated, Generator
 
+import psycopg2
+
 from ptracker.api.models import (
     Action,
     Candidate,
     Promise,
     Citation,
 )
-from ptracker.core.llm_utils import get_action_embedding, get_promise_embedding
+from ptracker.core.counters import COUNTERS, install_counter_triggers, repair_counters
+from ptracker.core.llm_utils import get_action_embedding, get_promise_embeddings
 from ptracker.core.settings import settings
 from ptracker.core.utils import get_logger
 
@@ -31,17 +34,23 @@ def _init_engine() -> Engine:
         ("IPv6", settings.SUPABASE_URL_IPV6.format(key=settings.SUPABASE_KEY)),
     ]
 
-    for protocol, database_uri in database_uris:
-        try:
-            _engine = create_engine(database_uri)
-            with _engine.connect() as connection:  # Quickly test the connection.
-                connection.execute(text("SELECT 1"))
-            return _engine
-        except OperationalError as e:
-            # Use pooled IPv4 sessions.
-            logger.warning(f"Tried to establish connection to database via {protocol} but "
-                           f"encountered:\n{e}\nRetrying with a different protocol.")
-    raise RuntimeError("Fatal error: could not connect to database.")
+    def connect() -> psycopg2.extensions.connection:
+        # Called for each new pooled connection, so nothing connects until the engine is first used; processes that
+        # only import this module, like spawned page parsers re-importing a worker's __main__, never connect.
+        for idx, (protocol, database_uri) in enumerate(database_uris):
+            try:
+                connection = psycopg2.connect(database_uri)
+            except psycopg2.OperationalError as e:
+                # Use pooled IPv4 sessions.
+                logger.warning(f"Tried to establish connection to database via {protocol} but "
+                               f"encountered:\n{e}\nRetrying with a different protocol.")
+                continue
+            # Try whichever protocol worked first from now on.
+            database_uris.insert(0, database_uris.pop(idx))
+            return connection
+        raise RuntimeError("Fatal error: could not connect to database.")
+
+    return create_engine("postgresql+psycopg2://", creator=connect)
 
 
 engine = _init_engine()
@@ -55,10 +64,39 @@ def get_db() -> Generator[Session, None, None]:
 SessionArg = Annotated[Session, Depends(get_db)]
 
 
+def _add_missing_columns(session: Session) -> list[str]:
+    # create_all skips tables that already exist, so add any columns since declared on them. Returns those added.
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    added_columns = []
+    for table in SQLModel.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            column_ddl = f"{column.name} {column.type.compile(dialect=engine.dialect)}"
+            if column.server_default is not None:
+                column_ddl += f" DEFAULT {column.server_default.arg}"
+                column_ddl += "" if column.nullable else " NOT NULL"
+            session.exec(text(f"ALTER TABLE {table.name} ADD COLUMN IF NOT EXISTS {column_ddl}"))
+            added_columns.append(f"{table.name}.{column.name}")
+    session.commit()
+    if added_columns:
+        logger.info(f"Added columns {added_columns} to existing tables.")
+    return added_columns
+
+
 def init_db(session: Session) -> None:
     session.exec(text('CREATE EXTENSION IF NOT EXISTS vector'))
     # Create candidates, promises, citations, and links tables.
     SQLModel.metadata.create_all(engine)
+    added_columns = _add_missing_columns(session)
+    # create_all skips tables that already exist, so add any indexes since declared on them.
+    for table in SQLModel.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst=True)
 
     index_names = ["action_embeds", "prom_embeds"]
     for index_name, model in zip(index_names, (Action, Promise)):
@@ -72,6 +110,12 @@ def init_db(session: Session) -> None:
         else:
             logger.info(f"Index {index_name} already exists, so will not recreate it.")
 
+    install_counter_triggers(session)
+    counter_columns = {f"{parent.__tablename__}.{counter}" for _, _, parent, counter in COUNTERS}
+    if counter_columns.intersection(added_columns):
+        # Counters added to tables that already have rows start out at zero.
+        repair_counters(session)
+
     query = select(Candidate)
     results = session.exec(query)
 
@@ -82,11 +126,13 @@ def init_db(session: Session) -> None:
                                     extract="Sample extract text snipped from article via AI.")
         ptext = "Lower costs, reduce regulations, cut taxes for the middle class, and incentivize corporations to " \
                 "build their products in the United States."
+        ptext2 = "Sample promise from article."
+        promise_embedding, promise_embedding2 = get_promise_embeddings([ptext, ptext2])
         promise = Promise(text=ptext,
                           _timestamp=datetime.today(),
                           status=0,
                           citations=[promise_citation],
-                          embedding=get_promise_embedding(ptext))
+                          embedding=promise_embedding)
         action_citation = Citation(date=datetime.now(),
                                    url="https://www.nytimes.com/2025/01/21/us/politics/harris-tariffs-action.html",
                                    extract="Sample extract text snipped from article via AI, but for an action!")
@@ -105,12 +151,11 @@ def init_db(session: Session) -> None:
         promise_citation2 = Citation(date=datetime.now(),
                                      url="https://www.google.com",
                                      extract="Sample extract text snipped from article via AI.")
-        ptext2 = "Sample promise from article."
         promise2 = Promise(text=ptext2,
                            _timestamp=datetime.today(),
                            status=0,
                            citations=[promise_citation2],
-                           embedding=get_promise_embedding(ptext2))
+                           embedding=promise_embedding2)
         candidate2 = \
             Candidate(name="Joe Biden",
                       description="Candidate for 2020 US presidential election with Kamala Harris as running mate.",
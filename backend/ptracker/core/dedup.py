@@ -0,0 +1,143 @@
+from typing import Any, Sequence
+
+import hashlib
+import numpy as np
+import re
+
+from ptracker.core import constants
+from ptracker.core.embedding_cache import normalize_text
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, idx: int) -> int:
+        root = idx
+        while self.parent[root] != root:
+            root = self.parent[root]
+        while self.parent[idx] != root:  # Path compression.
+            self.parent[idx], idx = root, self.parent[idx]
+        return root
+
+    def union(self, a: int, b: int) -> int:
+        # Returns the merged set's root.
+        root_a, root_b = self.find(a), self.find(b)
+        self.parent[max(root_a, root_b)] = min(root_a, root_b)
+        return min(root_a, root_b)
+
+
+def cluster_by_similarity(
+        embeddings: Sequence[Any],
+        threshold: float,
+        block_size: int = constants.SIMILARITY_BLOCK_SIZE,
+) -> list[list[int]]:
+    """
+    Group indices whose embeddings are all within `threshold` cosine similarity of each other.
+
+    Similarities are computed one (block_size x block_size) tile of the upper triangle at a time, so the matrix never
+    exists in full; only the pairs over the threshold are kept. Pairs are then merged with union-find, most similar
+    first, but only where every member of one set is similar to every member of the other (complete linkage), so a
+    run of pairwise-similar embeddings can't chain unrelated ones into one group. Visiting pairs by similarity rather
+    than by index makes the grouping independent of input order, up to exact ties. Assumes embeddings are already
+    normalized, as OpenAI's are.
+    """
+    if len(embeddings) == 0:
+        return []
+
+    matrix = np.asarray(embeddings, dtype=np.float32)
+    n = matrix.shape[0]
+    pairs: list[tuple[float, int, int]] = []
+    for row_start in range(0, n, block_size):
+        row_block = matrix[row_start:row_start + block_size]
+        for col_start in range(row_start, n, block_size):
+            similarities = row_block @ matrix[col_start:col_start + block_size].T
+            rows, cols = np.nonzero(similarities >= threshold)
+            upper = rows + row_start < cols + col_start
+            rows, cols = rows[upper], cols[upper]
+            pairs.extend(zip(similarities[rows, cols].tolist(), (rows + row_start).tolist(),
+                             (cols + col_start).tolist()))
+    pairs.sort(key=lambda pair: (-pair[0], pair[1], pair[2]))
+
+    clusters = UnionFind(n)
+    members = {idx: [idx] for idx in range(n)}
+    for _, a, b in pairs:
+        root_a, root_b = clusters.find(a), clusters.find(b)
+        if root_a == root_b:
+            continue
+        if (matrix[members[root_a]] @ matrix[members[root_b]].T).min() < threshold:
+            continue
+        merged = members.pop(root_a) + members.pop(root_b)
+        members[clusters.union(root_a, root_b)] = sorted(merged)
+    return sorted(members.values())
+
+
+def deduplicate_by_embedding(entity_jsons: list[dict]) -> list[dict]:
+    # Break ties in favor of longer entity text, then in favor of whichever entity was extracted first.
+    clusters = cluster_by_similarity([entity_json["embedding"] for entity_json in entity_jsons],
+                                     threshold=constants.DUPLICATE_ENTITY_SIM_THRESHOLD)
+    return [
+        entity_jsons[min(cluster, key=lambda idx: (-len(entity_jsons[idx]["text"]), idx))]
+        for cluster in clusters
+    ]
+
+
+def _normalized_key(text: str) -> str:
+    # Equal for texts that differ only in case, spacing, unicode form or surrounding punctuation.
+    return normalize_text(text).casefold().strip(" .,;:!?\"'“”‘’")
+
+
+def merge_identical_entities(entity_jsons: list[dict]) -> list[dict]:
+    """
+    Merge entities whose texts are identical once normalized, as when overlapping chunks yield one statement twice.
+    Cheap enough to run before paying to embed anything. The merged entity keeps the first text and the distinct
+    citations of all of them. A shared quote alone isn't enough to merge on, since one sentence can hold several
+    actions.
+    """
+    merged_jsons: dict[str, dict] = {}
+    for entity_json in entity_jsons:
+        key = _normalized_key(entity_json["text"])
+        if key not in merged_jsons:
+            merged_jsons[key] = dict(entity_json, citations=list(entity_json["citations"]))
+            continue
+        citations = merged_jsons[key]["citations"]
+        cited = {(citation["url"], citation["extract"]) for citation in citations}
+        citations.extend(citation for citation in entity_json["citations"]
+                         if (citation["url"], citation["extract"]) not in cited)
+    return list(merged_jsons.values())
+
+
+def simhash(text: str, shingle_size: int = constants.SIMHASH_SHINGLE_SIZE) -> int:
+    """
+    64-bit SimHash of a text's word shingles. Texts that share most of their shingles, like one wire story run by
+    several outlets with different headlines and bylines, get hashes that differ in only a few bits.
+    """
+    words = re.findall(r"\w+", text.lower())
+    shingles = [" ".join(words[idx:idx + shingle_size]) for idx in range(max(len(words) - shingle_size + 1, 1))]
+    hashes = np.array([int.from_bytes(hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "little")
+                       for shingle in shingles], dtype=np.uint64)
+    # Every shingle votes on every bit; a bit is set when most shingle hashes have it set.
+    bits = np.unpackbits(hashes.view(np.uint8).reshape(-1, 8), axis=1, bitorder="little")
+    majority = bits.sum(axis=0) * 2 > len(shingles)
+    return int.from_bytes(np.packbits(majority, bitorder="little").tobytes(), "little")
+
+
+def hamming_distance(a: int, b: int) -> int:
+    return (a ^ b).bit_count()
+
+
+def simhash_bands(fingerprint: int, max_distance: int) -> list[int]:
+    """
+    Split a 64-bit SimHash into `max_distance + 1` bands of (nearly) equal width. Hashes within `max_distance` bits of
+    each other differ in at most `max_distance` bands, so by the pigeonhole principle they share at least one band
+    exactly; indexing hashes by band finds every near-duplicate without comparing against all of them.
+    """
+    band_count = max_distance + 1
+    assert 0 < band_count <= 64, "SimHash bands must each have at least one bit."
+    bands = []
+    shift = 0
+    for idx in range(band_count):
+        width = 64 // band_count + (idx < 64 % band_count)
+        bands.append((fingerprint >> shift) & ((1 << width) - 1))
+        shift += width
+    return bands
@@ -0,0 +1,108 @@
+from typing import Iterable
+
+import os
+import sqlite3
+import threading
+import time
+
+_MAX_SQL_VARIABLES = 500  # Stay well below SQLite's per-statement limit, which is as low as 999 on older builds.
+
+
+class DiskLRUCache:
+    """
+    Small key -> bytes store backed by a local SQLite file, evicting least recently used entries once the stored
+    values exceed `max_bytes`. Safe to share between threads, and between processes on the same machine.
+    """
+    def __init__(self, path: str, max_bytes: int, table: str = "entries"):
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self.table = table
+        self.hits = 0
+        self.misses = 0
+
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, timeout=30, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute(f"CREATE TABLE IF NOT EXISTS {table} ("
+                                 f"key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+                                 f"last_used REAL NOT NULL)")
+        self._connection.execute(f"CREATE INDEX IF NOT EXISTS {table}_last_used ON {table} (last_used)")
+
+    def get(self, key: str) -> bytes | None:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: Iterable[str]) -> dict[str, bytes]:
+        keys = list(dict.fromkeys(keys))
+        if not keys:
+            return {}
+
+        found = {}
+        with self._lock:
+            for idx in range(0, len(keys), _MAX_SQL_VARIABLES):
+                key_batch = keys[idx:idx + _MAX_SQL_VARIABLES]
+                rows = self._connection.execute(
+                    f"SELECT key, value FROM {self.table} WHERE key IN ({','.join('?' * len(key_batch))})", key_batch
+                ).fetchall()
+                if rows:
+                    self._connection.execute(
+                        f"UPDATE {self.table} SET last_used = ? WHERE key IN ({','.join('?' * len(rows))})",
+                        [time.time(), *(key for key, _ in rows)]
+                    )
+                found.update(rows)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def set(self, key: str, value: bytes) -> None:
+        self.set_many([(key, value)])
+
+    def set_many(self, items: Iterable[tuple[str, bytes]]) -> None:
+        now = time.time()
+        rows = [(key, value, len(value), now) for key, value in items]
+        if not rows:
+            return
+
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+            try:
+                self._connection.executemany(
+                    f"INSERT OR REPLACE INTO {self.table} (key, value, size, last_used) VALUES (?, ?, ?, ?)", rows
+                )
+                self._evict()
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+    def _evict(self) -> None:
+        # Caller must hold the lock and an open transaction.
+        total_bytes = self._connection.execute(f"SELECT COALESCE(SUM(size), 0) FROM {self.table}").fetchone()[0]
+        if total_bytes <= self.max_bytes:
+            return
+
+        # Evict down to 90% of the budget so that we are not evicting again on every subsequent insert.
+        excess = total_bytes - int(self.max_bytes * 0.9)
+        evicted_bytes = 0
+        evicted_keys = []
+        for key, size in self._connection.execute(f"SELECT key, size FROM {self.table} ORDER BY last_used"):
+            if evicted_bytes >= excess:
+                break
+            evicted_keys.append((key,))
+            evicted_bytes += size
+        self._connection.executemany(f"DELETE FROM {self.table} WHERE key = ?", evicted_keys)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute(f"DELETE FROM {self.table} WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._connection.execute(f"DELETE FROM {self.table}")
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            entries, total_bytes = self._connection.execute(
+                f"SELECT COUNT(*), COALESCE(SUM(size), 0) FROM {self.table}"
+            ).fetchone()
+        return {"hits": self.hits, "misses": self.misses, "entries": entries, "bytes": total_bytes}
@@ -0,0 +1,80 @@
+from concurrent.futures import Future
+from typing import Callable
+
+import threading
+import time
+
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+EmbedManyFn = Callable[[list[str], int], list[list[float]]]
+
+
+class EmbeddingBatcher:
+    """
+    Collects single-text embedding requests from any number of threads and sends them as multi-input requests.
+
+    A batch is flushed as soon as it reaches `max_batch_size` texts, or once its oldest text has waited for
+    `max_wait_seconds`. Texts are batched separately per embedding dimensionality, since that is a request parameter.
+    """
+    def __init__(self, embed_many: EmbedManyFn, max_batch_size: int, max_wait_seconds: float):
+        self.embed_many = embed_many
+        self.max_batch_size = max_batch_size
+        self.max_wait_seconds = max_wait_seconds
+
+        # dimensions -> (time the oldest pending text was enqueued, pending (text, future) pairs)
+        self._pending: dict[int, tuple[float, list[tuple[str, Future]]]] = {}
+        self._condition = threading.Condition()
+        self._worker: threading.Thread | None = None
+
+    def submit(self, text: str, dimensions: int) -> Future:
+        future = Future()
+        with self._condition:
+            if self._worker is None:
+                self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+                self._worker.start()
+            enqueued_at, batch = self._pending.setdefault(dimensions, (time.monotonic(), []))
+            batch.append((text, future))
+            self._condition.notify()
+        return future
+
+    def embed(self, text: str, dimensions: int) -> list[float]:
+        return self.submit(text, dimensions).result()
+
+    def _take_ready_batch(self) -> tuple[int, list[tuple[str, Future]]] | None:
+        # Caller must hold the condition's lock. Returns None, after waiting as long as needed, only when empty.
+        while True:
+            if not self._pending:
+                return None
+            now = time.monotonic()
+            for dimensions, (enqueued_at, batch) in self._pending.items():
+                if len(batch) >= self.max_batch_size or now - enqueued_at >= self.max_wait_seconds:
+                    del self._pending[dimensions]
+                    if len(batch) > self.max_batch_size:
+                        # Put the overflow back; it has already waited, so it goes out on the next pass.
+                        self._pending[dimensions] = (enqueued_at, batch[self.max_batch_size:])
+                    return dimensions, batch[:self.max_batch_size]
+            oldest = min(enqueued_at for enqueued_at, _ in self._pending.values())
+            self._condition.wait(timeout=max(0.0, oldest + self.max_wait_seconds - now))
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                ready = self._take_ready_batch()
+                while ready is None:
+                    self._condition.wait()
+                    ready = self._take_ready_batch()
+
+            dimensions, batch = ready
+            texts = [text for text, _ in batch]
+            try:
+                embeddings = self.embed_many(texts, dimensions)
+            except Exception as e:  # Hand the failure to every waiting caller rather than killing the worker.
+                logger.warning(f"Failed to embed batch of {len(texts)} texts: {e}")
+                for _, future in batch:
+                    future.set_exception(e)
+                continue
+
+            for (_, future), embedding in zip(batch, embeddings):
+                future.set_result(embedding)
@@ -0,0 +1,46 @@
+from typing import Iterable
+
+import hashlib
+import numpy as np
+import re
+import unicodedata
+
+from ptracker.core.disk_cache import DiskLRUCache
+
+
+def normalize_text(text: str) -> str:
+    return re.sub(r"\s+", " ", unicodedata.normalize("NFKC", text)).strip()
+
+
+class EmbeddingCache:
+    """
+    Content-addressed embedding store, keyed by (model, dimensions, normalized text hash). Vectors are stored as
+    float32, which is all the precision pgvector keeps anyway.
+    """
+    def __init__(self, path: str, max_bytes: int, model: str):
+        self.store = DiskLRUCache(path=path, max_bytes=max_bytes, table="embeddings")
+        self.model = model
+
+    def _key(self, text: str, dimensions: int) -> str:
+        text_hash = hashlib.sha256(normalize_text(text).encode("utf-8")).hexdigest()
+        return f"{self.model}:{dimensions}:{text_hash}"
+
+    def get(self, text: str, dimensions: int) -> list[float] | None:
+        return self.get_many([text], dimensions).get(text)
+
+    def get_many(self, texts: Iterable[str], dimensions: int) -> dict[str, list[float]]:
+        text_keys = {text: self._key(text, dimensions) for text in texts}
+        found = self.store.get_many(text_keys.values())
+        return {
+            text: np.frombuffer(found[key], dtype=np.float32).tolist()
+            for text, key in text_keys.items() if key in found
+        }
+
+    def set_many(self, items: Iterable[tuple[str, list[float]]], dimensions: int) -> None:
+        self.store.set_many(
+            (self._key(text, dimensions), np.asarray(embedding, dtype=np.float32).tobytes())
+            for text, embedding in items
+        )
+
+    def stats(self) -> dict[str, int]:
+        return self.store.stats()
@@ -0,0 +1,65 @@
+from functools import cache
+from pydantic import BaseModel, ValidationError
+
+import hashlib
+import json
+
+from ptracker.core.disk_cache import DiskLRUCache
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+@cache
+def schema_hash(response_format: type[BaseModel]) -> str:
+    # Changes with any field of the response schema, not just its name.
+    return _sha256(json.dumps(response_format.model_json_schema(), sort_keys=True))
+
+
+class ExtractionCache:
+    """
+    Disk cache of parsed structured-output LLM responses, keyed by model name, response schema hash, prompt template
+    hash, candidate name and chunk hash. Editing a prompt template or response schema changes its hash, so stale
+    responses are never replayed; they simply age out of the LRU.
+    """
+    def __init__(self, path: str, max_bytes: int):
+        self.store = DiskLRUCache(path=path, max_bytes=max_bytes, table="extractions")
+
+    @staticmethod
+    def _key(model: str, prompt_template: str, candidate_name: str, extract: str, response_format: type) -> str:
+        return ":".join((model, response_format.__name__, schema_hash(response_format), _sha256(prompt_template),
+                         _sha256(candidate_name), _sha256(extract)))
+
+    def get(
+            self,
+            model: str,
+            prompt_template: str,
+            candidate_name: str,
+            extract: str,
+            response_format: type[BaseModel],
+    ) -> BaseModel | None:
+        key = self._key(model, prompt_template, candidate_name, extract, response_format)
+        cached = self.store.get(key)
+        if cached is None:
+            return None
+        try:
+            return response_format.model_validate_json(cached)
+        except ValidationError:
+            # Written by an incompatible version of the schema; treat it as a miss.
+            self.store.delete(key)
+            return None
+
+    def set(
+            self,
+            model: str,
+            prompt_template: str,
+            candidate_name: str,
+            extract: str,
+            response: BaseModel,
+    ) -> None:
+        self.store.set(self._key(model, prompt_template, candidate_name, extract, type(response)),
+                       response.model_dump_json().encode("utf-8"))
+
+    def stats(self) -> dict[str, int]:
+        return self.store.stats()
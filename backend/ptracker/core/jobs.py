@@ -0,0 +1,140 @@
+from datetime import timedelta
+from sqlmodel import and_, func, or_, select, update, Session
+
+from ptracker.api.models import ExtractionJob
+from ptracker.core.constants import PromiseExtractionPhase
+from ptracker.core.settings import settings
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+# Timestamps that coordinate workers always come from the database clock, never from a worker's own clock.
+_LEASE_DURATION = timedelta(seconds=settings.JOB_LEASE_SECONDS)
+
+
+def enqueue_extraction_job(session: Session, candidate_id: int, urls: list[str]) -> ExtractionJob:
+    job = ExtractionJob(candidate_id=candidate_id, urls=urls)
+    session.add(job)
+    session.commit()
+    session.refresh(job)
+    return job
+
+
+def lease_extraction_job(session: Session, worker_id: str) -> ExtractionJob | None:
+    """
+    Claim the oldest runnable job: either a queued one, or a started one whose worker stopped renewing its lease.
+    `SKIP LOCKED` lets any number of workers poll concurrently without blocking on, or double-claiming, a row.
+    """
+    while True:
+        job = session.exec(
+            select(ExtractionJob)
+            .where(or_(ExtractionJob.status == PromiseExtractionPhase.QUEUED,
+                       and_(ExtractionJob.status == PromiseExtractionPhase.STARTED,
+                            ExtractionJob.lease_expires_at < func.now())))
+            .order_by(ExtractionJob.id)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        ).first()
+
+        if job is None:
+            session.rollback()
+            return None
+
+        if job.attempts >= settings.JOB_MAX_ATTEMPTS:
+            # Its last worker died mid-run on the final attempt; don't let it crash-loop the fleet.
+            logger.warning(f"Extraction job {job.id} lost its lease on its final attempt; marking it failed.")
+            job.sqlmodel_update({"status": PromiseExtractionPhase.FAILED,
+                                 "lease_owner": None,
+                                 "updated_at": func.now()})
+            session.add(job)
+            session.commit()
+            continue
+
+        job.sqlmodel_update({"status": PromiseExtractionPhase.STARTED,
+                             "attempts": job.attempts + 1,
+                             "lease_owner": worker_id,
+                             "lease_expires_at": func.now() + _LEASE_DURATION,
+                             "updated_at": func.now()})
+        session.add(job)
+        session.commit()
+        session.refresh(job)
+        return job
+
+
+class LeaseLost(Exception):
+    pass
+
+
+def _update_leased_job_commitless(session: Session, job_id: int, worker_id: str, **values) -> bool:
+    # Only the current lease holder may touch a started job, so a worker that stalled past its lease and was
+    # superseded cannot overwrite the state written by its replacement.
+    result = session.exec(
+        update(ExtractionJob)
+        .where(and_(ExtractionJob.id == job_id,
+                    ExtractionJob.lease_owner == worker_id,
+                    ExtractionJob.status == PromiseExtractionPhase.STARTED))
+        .values(updated_at=func.now(), **values)
+    )
+    return result.rowcount == 1
+
+
+def _update_leased_job(session: Session, job_id: int, worker_id: str, **values) -> bool:
+    updated = _update_leased_job_commitless(session, job_id, worker_id, **values)
+    session.commit()
+    return updated
+
+
+def renew_lease(session: Session, job_id: int, worker_id: str) -> bool:
+    return _update_leased_job(session, job_id, worker_id, lease_expires_at=func.now() + _LEASE_DURATION)
+
+
+def record_processed_urls(
+        session: Session,
+        job_id: int,
+        worker_id: str,
+        processed_urls: list[str],
+        chunk_count: int,
+        skipped_chunk_count: int,
+) -> None:
+    """
+    Record progress in the caller's transaction, which also holds the entities of the newly processed urls; so either
+    both are committed, or a retry redoes those urls with nothing of theirs left behind. Raises `LeaseLost` if the job
+    was handed to another worker, which the caller must roll back on, since its replacement redoes the same urls.
+    """
+    if not _update_leased_job_commitless(session, job_id, worker_id,
+                                         processed_urls=processed_urls,
+                                         chunk_count=chunk_count,
+                                         skipped_chunk_count=skipped_chunk_count):
+        raise LeaseLost(f"Worker {worker_id} no longer holds the lease on extraction job {job_id}.")
+
+
+def record_failed_urls(session: Session, job_id: int, worker_id: str, failed_urls: dict[str, str]) -> None:
+    # Like `record_processed_urls`, for urls that can't be extracted at all, keyed to the reason why.
+    if not _update_leased_job_commitless(session, job_id, worker_id, failed_urls=failed_urls):
+        raise LeaseLost(f"Worker {worker_id} no longer holds the lease on extraction job {job_id}.")
+
+
+def count_active_workers(session: Session) -> int:
+    # Workers holding a live lease, i.e. the ones currently spending the LLM budget.
+    return session.exec(
+        select(func.count(func.distinct(ExtractionJob.lease_owner)))
+        .where(ExtractionJob.status == PromiseExtractionPhase.STARTED, ExtractionJob.lease_expires_at > func.now())
+    ).one()
+
+
+def complete_job(session: Session, job_id: int, worker_id: str) -> bool:
+    return _update_leased_job(session, job_id, worker_id,
+                              status=PromiseExtractionPhase.COMPLETE,
+                              lease_owner=None,
+                              lease_expires_at=None,
+                              error=None)
+
+
+def fail_job(session: Session, job_id: int, worker_id: str, attempts: int, error: str) -> bool:
+    # Failed attempts go back on the queue until the job is out of attempts.
+    status = PromiseExtractionPhase.FAILED if attempts >= settings.JOB_MAX_ATTEMPTS else PromiseExtractionPhase.QUEUED
+    return _update_leased_job(session, job_id, worker_id,
+                              status=status,
+                              lease_owner=None,
+                              lease_expires_at=None,
+                              error=error)
@@ -1,34 +1,136 @@
-from openai import OpenAI
-from sqlmodel import and_, col, select, Session
+from openai import OpenAI, RateLimitError
+from openai.types.chat import ParsedChatCompletion
+from pydantic import BaseModel
+from sqlmodel import and_, col, select, text, Session
 from typing import cast, Any
 
+import backoff
 import logging
 import numpy as np
 
 from ptracker.api.models import Action, Promise
 from ptracker.core import constants
+from ptracker.core.embedding_batcher import EmbeddingBatcher
+from ptracker.core.embedding_cache import EmbeddingCache
+from ptracker.core.rate_limiter import RateLimiter
 from ptracker.core.settings import settings
+from ptracker.core.utils import estimate_tokens
 
 logger = logging.getLogger(__name__)
 client = OpenAI(api_key=settings.OPENAI_KEY)
+embedding_cache = EmbeddingCache(path=settings.EMBEDDING_CACHE_PATH,
+                                 max_bytes=settings.EMBEDDING_CACHE_MAX_BYTES,
+                                 model=settings.EMBEDDING_MODEL_NAME)
+rate_limiter = RateLimiter(requests_per_minute=settings.LLM_REQUESTS_PER_MINUTE,
+                           tokens_per_minute=settings.LLM_TOKENS_PER_MINUTE)
+# OpenAI limits embeddings separately from chat completions, so a 429 from one mustn't throttle the other.
+embedding_rate_limiter = RateLimiter(requests_per_minute=settings.EMBEDDING_REQUESTS_PER_MINUTE,
+                                     tokens_per_minute=settings.EMBEDDING_TOKENS_PER_MINUTE)
 
 
-def get_promise_embedding(text: str) -> Any:
-    return client.embeddings.create(
-        input=text,
-        model="text-embedding-3-large",
+def _on_rate_limited(details: dict) -> None:
+    rate_limiter.record_rate_limited()
+    logger.warning(f"Rate limited by OpenAI on try {details['tries']}; backing off for {details['wait']:.1f}s "
+                   f"and throttling request rate to {rate_limiter.scale:.0%} of budget.")
+
+
+def _on_embedding_rate_limited(details: dict) -> None:
+    embedding_rate_limiter.record_rate_limited()
+    logger.warning(f"Rate limited by OpenAI embeddings on try {details['tries']}; backing off for "
+                   f"{details['wait']:.1f}s and throttling embedding requests to {embedding_rate_limiter.scale:.0%} "
+                   f"of budget.")
+
+
+@backoff.on_exception(backoff.expo,
+                      RateLimitError,
+                      max_tries=settings.LLM_MAX_RETRIES,
+                      on_backoff=_on_rate_limited)
+def parse_chat_completion(
+        messages: list[dict[str, str]],
+        response_format: type[BaseModel],
+        max_tokens: int = constants.EXTRACTION_MAX_TOKENS,
+) -> ParsedChatCompletion:
+    # Budget for the worst case: the whole prompt plus a completion that uses every token it may.
+    rate_limiter.acquire(tokens=sum(estimate_tokens(m["content"]) for m in messages) + max_tokens)
+    response = client.beta.chat.completions.parse(
+        model=settings.OPENAI_MODEL_NAME,
+        messages=messages,
+        max_tokens=max_tokens,
+        temperature=0.7,
+        top_p=0.95,
+        frequency_penalty=0,
+        presence_penalty=0,
+        stop=None,
+        response_format=response_format,
+    )
+    rate_limiter.record_success()
+    return response
+
+
+@backoff.on_exception(backoff.expo,
+                      RateLimitError,
+                      max_tries=settings.LLM_MAX_RETRIES,
+                      on_backoff=_on_embedding_rate_limited)
+def _create_embeddings(texts: list[str], dimensions: int) -> list[list[float]]:
+    embedding_rate_limiter.acquire(tokens=sum(estimate_tokens(text) for text in texts))
+    response = client.embeddings.create(
+        input=texts,
+        model=settings.EMBEDDING_MODEL_NAME,
         encoding_format="float",
-        dimensions=settings.PROMISE_EMBEDDING_DIM,
-    ).data[0].embedding
+        dimensions=dimensions,
+    )
+    embedding_rate_limiter.record_success()
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+
+
+def _embed_uncached(texts: list[str], dimensions: int) -> list[list[float]]:
+    # For texts already looked up in the cache and missed; embeds them and caches the results.
+    embeddings = {}
+    unique_texts = list(dict.fromkeys(texts))
+    for idx in range(0, len(unique_texts), settings.EMBEDDING_MAX_BATCH_SIZE):
+        text_batch = unique_texts[idx:idx + settings.EMBEDDING_MAX_BATCH_SIZE]
+        embedding_batch = _create_embeddings(text_batch, dimensions)
+        embedding_cache.set_many(zip(text_batch, embedding_batch), dimensions)
+        embeddings.update(zip(text_batch, embedding_batch))
+    return [embeddings[text] for text in texts]
+
+
+def embed_many(texts: list[str], dimensions: int) -> list[list[float]]:
+    embeddings = embedding_cache.get_many(texts, dimensions)
+    missing_texts = [text for text in dict.fromkeys(texts) if text not in embeddings]
+    if missing_texts:
+        embeddings.update(zip(missing_texts, _embed_uncached(missing_texts, dimensions)))
+    return [embeddings[text] for text in texts]
+
+
+# Only ever handed cache misses, so each text is looked up in the cache exactly once.
+embedding_batcher = EmbeddingBatcher(embed_many=_embed_uncached,
+                                     max_batch_size=settings.EMBEDDING_MAX_BATCH_SIZE,
+                                     max_wait_seconds=settings.EMBEDDING_MAX_WAIT_MS / 1000)
+
+
+def _get_embedding(text: str, dimensions: int) -> list[float]:
+    # Cache hits skip the batcher entirely, so they never wait on a batch to fill up.
+    embedding = embedding_cache.get(text, dimensions)
+    if embedding is None:
+        embedding = embedding_batcher.embed(text, dimensions)
+    return embedding
+
+
+def get_promise_embedding(text: str) -> Any:
+    return _get_embedding(text, dimensions=settings.PROMISE_EMBEDDING_DIM)
 
 
 def get_action_embedding(text: str) -> Any:
-    return client.embeddings.create(
-        input=text,
-        model="text-embedding-3-large",
-        encoding_format="float",
-        dimensions=settings.ACTION_EMBEDDING_DIM,
-    ).data[0].embedding
+    return _get_embedding(text, dimensions=settings.ACTION_EMBEDDING_DIM)
+
+
+def get_promise_embeddings(texts: list[str]) -> list[Any]:
+    return embed_many(texts, dimensions=settings.PROMISE_EMBEDDING_DIM)
+
+
+def get_action_embeddings(texts: list[str]) -> list[Any]:
+    return embed_many(texts, dimensions=settings.ACTION_EMBEDDING_DIM)
 
 
 def fetch_promises_by_embedding(session: Session, candidate_id: int, action_embedding: list[float]) -> list[Promise]:
@@ -53,6 +155,66 @@ def fetch_actions_by_embedding(session: Session, candidate_id: int, promise_embe
     return cast(list[Action], auto_assigned_actions)
 
 
+def _to_vector_literal(embedding: Any) -> str:
+    return "[" + ",".join(str(float(x)) for x in embedding) + "]"
+
+
+def fetch_nearest_neighbors(
+        session: Session,
+        model: type[Promise] | type[Action],
+        embeddings: list[Any],
+) -> list[tuple[int | None, float | None]]:
+    """
+    For every embedding, find the closest existing row of `model` and its cosine distance, in a single round trip.
+    Returns an (id, distance) pair per embedding, in input order; both are None if the table is empty.
+    """
+    if not embeddings:
+        return []
+
+    # Each LATERAL subquery is an ordinary nearest-neighbor query, so it is still served by the HNSW index.
+    query = text(f"""
+        SELECT new.idx, nearest.id, nearest.distance
+        FROM unnest(CAST(:embeddings AS vector[])) WITH ORDINALITY AS new(embedding, idx)
+        LEFT JOIN LATERAL (
+            SELECT existing.id, existing.embedding <=> new.embedding AS distance
+            FROM {model.__tablename__} AS existing
+            ORDER BY existing.embedding <=> new.embedding
+            LIMIT 1
+        ) AS nearest ON TRUE
+        ORDER BY new.idx
+    """)
+    rows = session.exec(query, params={"embeddings": [_to_vector_literal(e) for e in embeddings]}).all()
+    return [(existing_id, distance) for _, existing_id, distance in rows]
+
+
+def fetch_links_by_embedding(
+        session: Session,
+        candidate_id: int,
+        model: type[Promise] | type[Action],
+        ids: list[int],
+        embeddings: list[Any],
+) -> list[tuple[int, int]]:
+    """
+    Match many new entities against all of a candidate's existing `model` rows in one query. Returns a (new id,
+    existing id) pair for every match within PROMISE_ACTION_DIST_THRESHOLD.
+    """
+    if not ids:
+        return []
+
+    query = text(f"""
+        SELECT new.id, existing.id
+        FROM unnest(CAST(:ids AS integer[]), CAST(:embeddings AS vector[])) AS new(id, embedding)
+        JOIN {model.__tablename__} AS existing
+          ON existing.candidate_id = :candidate_id
+         AND existing.embedding <=> new.embedding < :threshold
+    """)
+    rows = session.exec(query, params={"ids": ids,
+                                       "embeddings": [_to_vector_literal(e) for e in embeddings],
+                                       "candidate_id": candidate_id,
+                                       "threshold": constants.PROMISE_ACTION_DIST_THRESHOLD}).all()
+    return [(new_id, existing_id) for new_id, existing_id in rows]
+
+
 def cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
     # Assumes embeddings are *already normalized*, which is true for OpenAI models.
     return np.dot(a, b)
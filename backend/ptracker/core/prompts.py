@@ -68,4 +68,52 @@ ACTION_EXTRACTION_SYSTEM_PROMPT = ACTION_EXTRACTION_SYSTEM_PROMPT = """You are a
        "actions": []
      }
      ```
-"""
\ No newline at end of file
+"""
+
+PROMISE_AND_ACTION_EXTRACTION_SYSTEM_PROMPT = """You are an expert in analyzing political speech and news coverage by or about the politician {{name}}. Your task is to extract, from the same input text, both the politician's **promises** (commitments about the future) and the politician's **actions** (things already done or being done), each with the exact quote it came from.
+
+### **Promises**
+A promise fragment must meet all of the following criteria:
+- Actionable: The statement must clearly describe an action or initiative the politician commits to taking (e.g., 'I will build 500 affordable housing units').
+- Measurable: The promise must include specific and quantifiable outcomes or timelines (e.g., 'within the next year').
+- Exclusion of implied or vague statements: Do not include aspirational, motivational, or rhetorical statements. If the statement lacks specificity or does not commit to a direct action, exclude it.
+- Focus on direct fragments: If the statement contains multiple sentences, extract only the fragment directly fulfilling the actionable and measurable criteria. Exclude all additional context, introductory phrases, or rhetorical elements.
+
+### **Actions**
+An action must be something the politician **did** or **is doing** (e.g., "Signed legislation...", "Declared an emergency...", "Announced a new policy..."). Strictly exclude:
+- Future promises, intentions, plans or speculation. Never convert a future plan into a completed action; those belong under promises, if they qualify at all.
+- Expressions of confidence, emotions, or opinions.
+- Statements of support, endorsements, or acknowledgments.
+- Requests, calls for action, or urging others.
+- General statements about priorities without action.
+
+### **Output Format (JSON structured response)**
+{
+    "promises": [
+        {
+            "politician_name": "Name of the politician",
+            "promise_text": "A succinct description of the politician's actionable and measurable promise, phrased as a declarative statement starting with a verb",
+            "exact_quote": "The verbatim snippet from the input text containing the actionable and measurable promise.",
+            "is_promise": true or false
+        }
+    ],
+    "actions": [
+        {
+            "politician_name": "Name of the politician",
+            "action_text": "A succinct summary of the past or present action in declarative form",
+            "exact_quote": "The verbatim full sentence(s) from which the action was extracted.",
+            "is_action": true or false
+        }
+    ]
+}
+
+Every `exact_quote` must be copied verbatim from the input text. A statement is never both a promise and an action. If no valid promises or actions are found, return an empty list for that key.
+"""
+
+PACKED_EXTRACTION_INSTRUCTIONS = """
+### **Multiple chunks**
+The input contains several independent chunks of text, each wrapped in `<chunk id="N">` and `</chunk>` tags. Apply the instructions above to every chunk separately, and return exactly one entry in `results` per chunk:
+- `chunk_id` is the id of the chunk the entry is about.
+- `result` is what you would have returned had that chunk been the only input.
+Every `exact_quote` in a result must be copied verbatim from that result's own chunk, never from another chunk, and must not include the chunk tags.
+"""
@@ -0,0 +1,97 @@
+import threading
+import time
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket. `acquire` blocks until enough budget has refilled, and `rate_scale` lets callers slow
+    the refill rate down (and speed it back up) without resetting the bucket. `share` scales capacity and refill rate
+    alike, for a bucket that holds only this process's part of a budget shared with others.
+    """
+    def __init__(self, capacity: float, refill_per_second: float):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.rate_scale = 1.0
+        self.share = 1.0
+        self._available = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed = now - self._last_refill
+        self._available = min(self.capacity * self.share,
+                              self._available + elapsed * self.refill_per_second * self.rate_scale * self.share)
+        self._last_refill = now
+
+    def acquire(self, amount: float = 1.0) -> None:
+        # Requests bigger than the whole bucket would otherwise wait forever; let them drain it instead.
+        while True:
+            with self._lock:
+                self._refill()
+                amount = min(amount, self.capacity * self.share)
+                if self._available >= amount:
+                    self._available -= amount
+                    return
+                wait_seconds = (amount - self._available) / (self.refill_per_second * self.rate_scale * self.share)
+            time.sleep(wait_seconds)
+
+    def drain(self) -> None:
+        with self._lock:
+            self._refill()
+            self._available = 0.0
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budget shared by every thread calling the LLM. Processes that share
+    one quota each call `set_share` with their part of it.
+
+    The refill rate adapts AIMD-style: each rate limit error halves it (down to `min_scale`), and each success
+    recovers a little of it, so a pool of workers settles just under whatever quota the provider actually enforces.
+    """
+    def __init__(
+            self,
+            requests_per_minute: int,
+            tokens_per_minute: int,
+            min_scale: float = 0.1,
+            recovery_step: float = 0.05,
+    ):
+        self.request_bucket = TokenBucket(capacity=requests_per_minute, refill_per_second=requests_per_minute / 60)
+        self.token_bucket = TokenBucket(capacity=tokens_per_minute, refill_per_second=tokens_per_minute / 60)
+        self.min_scale = min_scale
+        self.recovery_step = recovery_step
+        self._lock = threading.Lock()
+
+    @property
+    def scale(self) -> float:
+        return self.request_bucket.rate_scale
+
+    @property
+    def share(self) -> float:
+        return self.request_bucket.share
+
+    def _set_scale(self, scale: float) -> None:
+        self.request_bucket.rate_scale = scale
+        self.token_bucket.rate_scale = scale
+
+    def set_share(self, share: float) -> None:
+        with self._lock:
+            self.request_bucket.share = share
+            self.token_bucket.share = share
+
+    def acquire(self, tokens: int) -> None:
+        self.request_bucket.acquire(1)
+        self.token_bucket.acquire(tokens)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self.scale < 1.0:
+                self._set_scale(min(1.0, self.scale + self.recovery_step))
+
+    def record_rate_limited(self) -> None:
+        with self._lock:
+            self._set_scale(max(self.min_scale, self.scale / 2))
+        # Whatever budget we thought we had was evidently wrong, so make every caller wait for a refill.
+        self.request_bucket.drain()
+        self.token_bucket.drain()
@@ -29,6 +29,7 @@ class Settings(BaseSettings):
     BACKEND_CORS_ORIGINS: Annotated[list[AnyUrl] | str, BeforeValidator(parse_cors)] = []
     BACKEND_ADDRESS: str = "127.0.0.1"  # Prod: 0.0.0.0
     BACKEND_PORT: int = 8000
+    RESPONSE_CACHE_MAX_BYTES: int = 64 * 1024 ** 2  # 0 disables the response cache, but not ETags.
 
     SUPABASE_URL_IPV4: str
     SUPABASE_URL_IPV6: str
@@ -38,8 +39,45 @@ class Settings(BaseSettings):
     OPENAI_MODEL_NAME: str
 
     CITATION_EXTRACT_LENGTH: int
+    CHUNK_MAX_TOKENS: int = 400
+    CHUNK_OVERLAP_TOKENS: int = 40
+    RELEVANCE_FILTER_RECALL: float = 1.0  # 1 turns the filter off; see RelevanceFilter for lower settings.
+    RELEVANCE_FILTER_PRONOUN_WINDOW: int = 2  # chunks
     PROMISE_EMBEDDING_DIM: int
     ACTION_EMBEDDING_DIM: int
+    EMBEDDING_MODEL_NAME: str = "text-embedding-3-large"
+    EMBEDDING_MAX_BATCH_SIZE: int = 256
+    EMBEDDING_MAX_WAIT_MS: int = 20
+    EMBEDDING_REQUESTS_PER_MINUTE: int = 3000  # For all workers together, like the LLM budget below.
+    EMBEDDING_TOKENS_PER_MINUTE: int = 1_000_000
+    EMBEDDING_CACHE_PATH: str = "~/.cache/ptracker/embeddings.sqlite3"
+    EMBEDDING_CACHE_MAX_BYTES: int = 256 * 1024 ** 2
+
+    FETCH_MAX_WORKERS: int = 16
+    FETCH_MAX_PER_HOST: int = 4
+    FETCH_CONNECT_TIMEOUT: float = 5.0  # seconds
+    FETCH_READ_TIMEOUT: float = 20.0  # seconds
+    FETCH_TOTAL_TIMEOUT: float = 60.0  # seconds, for the whole download; the read timeout is per read.
+    FETCH_MAX_BYTES: int = 5 * 1024 ** 2
+    PARSE_MAX_PROCESSES: int = 2  # 0 parses pages on the calling thread instead.
+
+    LLM_MAX_CONCURRENCY: int = 8
+    LLM_REQUESTS_PER_MINUTE: int = 500  # For all workers together; each takes an even share.
+    LLM_TOKENS_PER_MINUTE: int = 200_000  # Likewise.
+    LLM_MAX_RETRIES: int = 6
+    LLM_CONTEXT_TOKENS: int = 128_000
+    LLM_MAX_OUTPUT_TOKENS: int = 16_384
+    EXTRACTION_PACK_MAX_CHUNKS: int = 1  # Chunks sent per extraction request; 1 disables packing.
+    JOINT_EXTRACTION: bool = False  # Extract promises and actions from each chunk with one LLM call instead of two.
+
+    EXTRACTION_CACHE_PATH: str = "~/.cache/ptracker/extractions.sqlite3"
+    EXTRACTION_CACHE_MAX_BYTES: int = 256 * 1024 ** 2
+    EXTRACTION_CACHE_BYPASS: bool = False  # Skip cache reads, e.g. to re-sample responses; results are still stored.
+
+    JOB_LEASE_SECONDS: int = 300  # Workers renew their lease at a third of this interval while a job runs.
+    JOB_MAX_ATTEMPTS: int = 3
+    WORKER_POLL_SECONDS: float = 5.0
+    WORKER_REBALANCE_SECONDS: float = 15.0  # How often running workers re-split the LLM budget between them.
 
     @computed_field
     @property
@@ -1,2 +1,9 @@
-from .entity_extractor import ActionExtractor, EntityExtractor, PromiseExtractor
-from .source_analyzer import analyze_sources
+from .entity_extractor import (
+    ActionExtractor,
+    EntityExtractor,
+    JointEntityExtractor,
+    PromiseActionExtractor,
+    PromiseExtractor,
+    get_entities_from_extracts,
+)
+from .source_analyzer import analyze_sources, ExtractionDeferred, ExtractionStopped
@@ -0,0 +1,211 @@
+from dataclasses import dataclass, field
+from datetime import datetime
+from sqlmodel import insert, or_, select, update, Session
+
+from ptracker.api.models import Action, Citation, Promise, SourceArticle
+from ptracker.core import constants
+from ptracker.core.changes import notify_candidate_changed
+from ptracker.core.db import engine
+from ptracker.core.dedup import hamming_distance, simhash_bands
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+_UINT64 = 1 << 64
+
+
+def _to_signed(fingerprint: int) -> int:
+    # Postgres has no unsigned 64-bit integer, so fingerprints are stored as BIGINT with the same bits.
+    return fingerprint - _UINT64 if fingerprint >= 1 << 63 else fingerprint
+
+
+def _to_unsigned(fingerprint: int) -> int:
+    return fingerprint % _UINT64
+
+
+@dataclass
+class KnownArticle:
+    url: str
+    fingerprint: int
+    id: int | None = None  # Set once the article is recorded in the database.
+    canonical: bool = True
+    etag: str | None = None
+    last_modified: str | None = None
+    extraction_version: str | None = None
+
+
+@dataclass
+class DuplicateArticle:
+    url: str
+    text: str
+    fingerprint: int
+    canonical: KnownArticle
+
+
+@dataclass
+class ArticleDeduplicator:
+    """
+    Recognizes near-duplicate articles, e.g. one wire story syndicated by several outlets, by the SimHash of their
+    text. The first copy seen is canonical and gets extracted; later copies are set aside in `duplicates`, to be
+    cited on the canonical copy's entities instead of being extracted again.
+
+    With a `candidate_id`, articles already extracted for that candidate count as seen; without one, only articles
+    seen by this deduplicator do. Recorded articles also keep their HTTP validators, for conditional re-fetches.
+
+    Canonical articles are indexed by the bands of their SimHash, so `check` only compares an article against those
+    sharing a band with it, rather than against every article the candidate has.
+    """
+    candidate_id: int | None = None
+    extraction_version: str | None = None  # Of all the extractors in use, together.
+    max_distance: int = constants.NEAR_DUPLICATE_ARTICLE_DISTANCE
+    articles: list[KnownArticle] = field(default_factory=list)
+    duplicates: list[DuplicateArticle] = field(default_factory=list)
+    fetched_validators: dict[str, tuple[str | None, str | None]] = field(default_factory=dict)
+    # Positions in `articles`, by url and by (band index, band value) of canonical articles' SimHashes.
+    _url_index: dict[str, list[int]] = field(default_factory=dict, init=False, repr=False)
+    _band_index: dict[tuple[int, int], set[int]] = field(default_factory=dict, init=False, repr=False)
+
+    def __post_init__(self):
+        articles, self.articles = self.articles, []
+        if self.candidate_id is not None:
+            with Session(engine) as session:
+                source_articles = session.exec(
+                    select(SourceArticle).where(SourceArticle.candidate_id == self.candidate_id)
+                ).all()
+            articles.extend(KnownArticle(url=source_article.url,
+                                         fingerprint=_to_unsigned(source_article.fingerprint),
+                                         id=source_article.id,
+                                         canonical=source_article.canonical_id is None,
+                                         etag=source_article.etag,
+                                         last_modified=source_article.last_modified,
+                                         extraction_version=source_article.extraction_version)
+                            for source_article in source_articles)
+        for article in articles:
+            self._add(article)
+
+    def _add(self, article: KnownArticle) -> None:
+        position = len(self.articles)
+        self.articles.append(article)
+        self._url_index.setdefault(article.url, []).append(position)
+        if article.canonical:
+            self._index_bands(position)
+
+    def _index_bands(self, position: int, remove: bool = False) -> None:
+        for band in enumerate(simhash_bands(self.articles[position].fingerprint, self.max_distance)):
+            if remove:
+                self._band_index[band].discard(position)
+            else:
+                self._band_index.setdefault(band, set()).add(position)
+
+    def _articles_at(self, url: str) -> list[KnownArticle]:
+        return [self.articles[position] for position in self._url_index.get(url, [])]
+
+    def _canonical_position(self, url: str) -> int | None:
+        return next((position for position in self._url_index.get(url, []) if self.articles[position].canonical), None)
+
+    def _canonical_article(self, url: str) -> KnownArticle | None:
+        position = self._canonical_position(url)
+        return self.articles[position] if position is not None else None
+
+    def _nearest_canonical(self, fingerprint: int) -> KnownArticle | None:
+        # Only canonical articles sharing a band can be within `max_distance`; ties go to the one seen first.
+        positions = set().union(*(self._band_index.get(band, ())
+                                  for band in enumerate(simhash_bands(fingerprint, self.max_distance))))
+        return min((self.articles[position] for position in sorted(positions)),
+                   key=lambda article: hamming_distance(article.fingerprint, fingerprint),
+                   default=None)
+
+    def validators(self) -> dict[str, tuple[str | None, str | None]]:
+        # (ETag, Last-Modified) of every article whose last fetch was extracted by the same extractors as now. An
+        # unchanged page is then fully processed already, and needn't even be downloaded.
+        return {
+            article.url: (article.etag, article.last_modified) for article in self.articles
+            if article.canonical and article.id is not None and (article.etag or article.last_modified)
+            and article.extraction_version == self.extraction_version
+        }
+
+    def update_validators(self, url: str, etag: str | None, last_modified: str | None) -> None:
+        # Taken from a fresh fetch of the url, and written by `record` once the url is processed.
+        self.fetched_validators[url] = (etag, last_modified)
+
+    def check(self, url: str, text: str, fingerprint: int) -> bool:
+        """
+        Returns whether the article should be extracted, i.e. is not a near-duplicate of one seen before. A
+        duplicate is set aside in `duplicates`, unless the same url was already cited as one, in which case there is
+        nothing left to do for it. A url that was extracted before is extracted again, since its content may have
+        changed; the chunk ledger skips whatever hasn't.
+        """
+        position = self._canonical_position(url)
+        if position is not None:
+            self._index_bands(position, remove=True)
+            self.articles[position].fingerprint = fingerprint
+            self._index_bands(position)
+            return True
+        if any(hamming_distance(article.fingerprint, fingerprint) <= self.max_distance
+               for article in self._articles_at(url)):
+            logger.info(f"{url} has already been cited as a near-duplicate; skipping it.")
+            return False
+
+        canonical = self._nearest_canonical(fingerprint)
+        if canonical is None or hamming_distance(canonical.fingerprint, fingerprint) > self.max_distance:
+            self._add(KnownArticle(url=url, fingerprint=fingerprint))
+            return True
+
+        logger.info(f"{url} is a near-duplicate of {canonical.url}; citing it without extracting it again.")
+        self.duplicates.append(DuplicateArticle(url=url, text=text, fingerprint=fingerprint, canonical=canonical))
+        self._add(KnownArticle(url=url, fingerprint=fingerprint, canonical=False))
+        return False
+
+    def record(self, session: Session, url: str) -> None:
+        # In the session that adds the article's entities, so a retried job never mistakes it for already extracted.
+        article = self._canonical_article(url)
+        if self.candidate_id is None or article is None:
+            return
+        article.extraction_version = self.extraction_version
+        if url in self.fetched_validators:
+            article.etag, article.last_modified = self.fetched_validators.pop(url)
+        values = {
+            "fingerprint": _to_signed(article.fingerprint),
+            "etag": article.etag,
+            "last_modified": article.last_modified,
+            "extraction_version": article.extraction_version,
+        }
+        if article.id is not None:
+            session.exec(update(SourceArticle).where(SourceArticle.id == article.id).values(**values))
+        else:
+            source_article = SourceArticle(candidate_id=self.candidate_id, url=url, **values)
+            session.add(source_article)
+            session.flush()
+            article.id = source_article.id
+
+    def cite_duplicate(self, session: Session, duplicate: DuplicateArticle) -> int:
+        """
+        Cite a duplicate on every entity of the candidate that cites its canonical copy, wherever the cited extract
+        appears verbatim in the duplicate too, without committing. Returns the number of citations added.
+        """
+        assert self.candidate_id is not None, "Citing a duplicate article requires the candidate it belongs to."
+        canonical_citations = session.exec(
+            select(Citation)
+            .outerjoin(Promise, Citation.promise_id == Promise.id)
+            .outerjoin(Action, Citation.action_id == Action.id)
+            .where(Citation.url == duplicate.canonical.url,
+                   or_(Promise.candidate_id == self.candidate_id, Action.candidate_id == self.candidate_id))
+        ).all()
+        citation_jsons = [
+            {
+                "date": datetime.now(),
+                "extract": citation.extract,
+                "url": duplicate.url,
+                "promise_id": citation.promise_id,
+                "action_id": citation.action_id,
+            }
+            for citation in canonical_citations if citation.extract in duplicate.text
+        ]
+        if citation_jsons:
+            session.exec(insert(Citation), params=citation_jsons)
+            notify_candidate_changed(session, self.candidate_id)
+        session.add(SourceArticle(candidate_id=self.candidate_id,
+                                  url=duplicate.url,
+                                  fingerprint=_to_signed(duplicate.fingerprint),
+                                  canonical_id=duplicate.canonical.id))
+        return len(citation_jsons)
@@ -0,0 +1,228 @@
+from collections import Counter, deque, OrderedDict
+from concurrent.futures import Future, FIRST_COMPLETED, ThreadPoolExecutor, wait
+from dataclasses import dataclass, field
+from requests.adapters import HTTPAdapter
+from typing import Generator
+from urllib.parse import urlparse
+
+import codecs
+import re
+import requests
+import threading
+import time
+
+from ptracker.core.settings import settings
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+_HTML_CONTENT_TYPES = {"text/html", "application/xhtml+xml"}
+_READ_CHUNK_BYTES = 16 * 1024  # Also how often the total timeout is checked, on a trickling download.
+_CHARSET = re.compile(r"""charset=["']?([\w-]+)""", re.I)
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset=["']?([\w-]+)""", re.I)
+
+
+class FetchAborted(Exception):
+    pass
+
+
+def _looks_like_html(head: bytes) -> bool:
+    # For servers that send no content type, or a generic binary one.
+    head = head.lstrip(codecs.BOM_UTF8).lstrip().lower()
+    return head.startswith((b"<!doctype html", b"<html")) or b"<body" in head or b"<head" in head
+
+
+def _charset(content_type: str, head: bytes) -> str:
+    # The declared charset, else one given in a <meta> tag, else UTF-8 (not requests' ISO-8859-1 fallback for text/*).
+    match = _CHARSET.search(content_type) or _META_CHARSET.search(head)
+    if match is None:
+        return "utf-8"
+    declared = match.group(1)
+    try:
+        return codecs.lookup(declared.decode("ascii") if isinstance(declared, bytes) else declared).name
+    except LookupError:
+        return "utf-8"
+
+
+@dataclass
+class FetchedPage:
+    url: str
+    html: str | None  # None if the fetch failed, or if the page is unchanged.
+    etag: str | None = None
+    last_modified: str | None = None
+    not_modified: bool = False
+    size: int = 0  # bytes downloaded
+    seconds: float = 0.0
+    error: str | None = None  # Why the fetch failed, if it did.
+
+
+@dataclass
+class FetchStats:
+    pages: int = 0
+    failed: int = 0
+    size: int = 0
+    seconds: list[float] = field(default_factory=list)
+
+    def add(self, page: FetchedPage) -> None:
+        self.pages += 1
+        self.failed += page.html is None and not page.not_modified
+        self.size += page.size
+        self.seconds.append(page.seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.seconds:
+            return 0.0
+        seconds = sorted(self.seconds)
+        return seconds[min(int(q * len(seconds)), len(seconds) - 1)]
+
+
+class ArticleFetcher:
+    """
+    Fetches article pages concurrently over a shared, pooled HTTP session.
+
+    `fetch_all` spreads requests over a thread pool, but keeps no more than `max_per_host` of them in flight against
+    the same host at once, so a long list of sources from one outlet does not hammer that outlet, and a slow outlet
+    can't tie up every thread while other hosts wait.
+
+    Bodies are streamed, so a page is given up on as soon as it turns out not to be HTML, outgrows `max_bytes`, or
+    takes longer than `total_timeout` to arrive; a slow or huge download can't hold up a worker for long.
+    """
+    def __init__(
+            self,
+            max_workers: int = settings.FETCH_MAX_WORKERS,
+            max_per_host: int = settings.FETCH_MAX_PER_HOST,
+            timeout: tuple[float, float] = (settings.FETCH_CONNECT_TIMEOUT, settings.FETCH_READ_TIMEOUT),
+            total_timeout: float = settings.FETCH_TOTAL_TIMEOUT,
+            max_bytes: int = settings.FETCH_MAX_BYTES,
+    ):
+        self.max_workers = max_workers
+        self.max_per_host = max_per_host
+        # Pages fetched or being fetched ahead of the caller, so memory doesn't grow with the number of urls.
+        self.max_pending = 2 * max_workers
+        self.timeout = timeout
+        self.total_timeout = total_timeout
+        self.max_bytes = max_bytes
+        self.stats = FetchStats()
+
+        self.session = requests.Session()
+        self.session.headers.update({"User-Agent": f"{settings.PROJECT_NAME}/{settings.PROJECT_VERSION}"})
+        adapter = HTTPAdapter(pool_connections=max_workers, pool_maxsize=max_workers)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._stats_lock = threading.Lock()
+
+    def __enter__(self) -> "ArticleFetcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self.session.close()
+
+    def _read_html(self, response: requests.Response, started: float) -> tuple[str, int]:
+        # Returns the decoded page and its size in bytes, reading and decoding it a piece at a time.
+        content_type = response.headers.get("Content-Type", "")
+        mime_type = content_type.split(";")[0].strip().lower()
+        if mime_type and mime_type not in _HTML_CONTENT_TYPES and mime_type != "application/octet-stream":
+            raise FetchAborted(f"content type {mime_type} is not HTML")
+        content_length = response.headers.get("Content-Length", "")
+        if content_length.isdigit() and int(content_length) > self.max_bytes:
+            raise FetchAborted(f"content length {content_length} is over the {self.max_bytes} byte limit")
+
+        decoder = None
+        parts = []
+        size = 0
+        for piece in response.iter_content(chunk_size=_READ_CHUNK_BYTES):
+            size += len(piece)
+            if size > self.max_bytes:
+                raise FetchAborted(f"page is over the {self.max_bytes} byte limit")
+            if time.monotonic() - started > self.total_timeout:
+                raise FetchAborted(f"download took over {self.total_timeout}s")
+            if decoder is None:
+                if mime_type in ("", "application/octet-stream") and not _looks_like_html(piece):
+                    raise FetchAborted("content does not look like HTML")
+                decoder = codecs.getincrementaldecoder(_charset(content_type, piece))(errors="replace")
+            parts.append(decoder.decode(piece))
+        if decoder is not None:
+            parts.append(decoder.decode(b"", final=True))
+        return "".join(parts), size
+
+    def fetch(self, url: str, validators: tuple[str | None, str | None] | None = None) -> FetchedPage:
+        # With the (ETag, Last-Modified) validators of an earlier fetch, an unchanged page is not downloaded again.
+        page = self._fetch(url, validators)
+        with self._stats_lock:
+            self.stats.add(page)
+        logger.info(f"Fetched {page.size} bytes from '{url}' in {page.seconds:.2f}s.")
+        return page
+
+    def _fetch(self, url: str, validators: tuple[str | None, str | None] | None) -> FetchedPage:
+        headers = {}
+        if validators is not None:
+            etag, last_modified = validators
+            if etag:
+                headers["If-None-Match"] = etag
+            if last_modified:
+                headers["If-Modified-Since"] = last_modified
+
+        started = time.monotonic()
+        try:
+            with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+                if response.status_code == 304 and headers:
+                    return FetchedPage(url=url, html=None, not_modified=True, seconds=time.monotonic() - started)
+                if response.status_code != 200:  # brittle?
+                    logger.warning(f"In trying to visit '{url}' as part of promise extraction flow, "
+                                   f"received unhappy status code {response.status_code}.")
+                    return FetchedPage(url=url, html=None, seconds=time.monotonic() - started,
+                                       error=f"status code {response.status_code}")
+                html, size = self._read_html(response, started)
+        except (requests.RequestException, FetchAborted) as e:
+            logger.warning(f"In trying to visit '{url}' as part of promise extraction flow, encountered: {e}")
+            return FetchedPage(url=url, html=None, seconds=time.monotonic() - started, error=str(e) or repr(e))
+
+        return FetchedPage(url=url,
+                           html=html,
+                           etag=response.headers.get("ETag"),
+                           last_modified=response.headers.get("Last-Modified"),
+                           size=size,
+                           seconds=time.monotonic() - started)
+
+    def fetch_all(
+            self,
+            urls: list[str],
+            validators: dict[str, tuple[str | None, str | None]] | None = None,
+    ) -> Generator[FetchedPage, None, None]:
+        # Yield pages in completion order, so that extraction can start on whichever page arrives first.
+        validators = validators or {}
+        queued: OrderedDict[str, deque[str]] = OrderedDict()  # Urls not yet submitted, by host.
+        for url in urls:
+            queued.setdefault(urlparse(url).netloc, deque()).append(url)
+        in_flight: dict[Future, str] = {}  # Future -> its host
+        host_counts: Counter[str] = Counter()
+
+        def submit_more(pool: ThreadPoolExecutor) -> None:
+            # Fill the window with urls of hosts below their limit, rather than queueing behind a busy host.
+            for host, host_urls in list(queued.items()):
+                while host_urls and host_counts[host] < self.max_per_host and len(in_flight) < self.max_pending:
+                    url = host_urls.popleft()
+                    in_flight[pool.submit(self.fetch, url, validators.get(url))] = host
+                    host_counts[host] += 1
+                if not host_urls:
+                    del queued[host]
+                if len(in_flight) >= self.max_pending:
+                    return
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="fetch") as pool:
+            submit_more(pool)
+            try:
+                while in_flight:
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        host_counts[in_flight.pop(future)] -= 1
+                        submit_more(pool)
+                        yield future.result()
+            finally:
+                # If the caller stops early, don't start the fetches still queued.
+                for future in in_flight:
+                    future.cancel()
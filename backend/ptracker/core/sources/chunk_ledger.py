@@ -0,0 +1,72 @@
+from sqlalchemy.dialects.postgresql import insert
+from sqlmodel import select, Session
+from typing import Sequence
+
+import hashlib
+
+from ptracker.api.models import ProcessedChunk
+from ptracker.core.db import engine
+from ptracker.core.extraction_cache import schema_hash
+from ptracker.core.settings import settings
+from ptracker.core.sources.entity_extractor import EntityExtractor, JointEntityExtractor
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def extraction_version(extractor: EntityExtractor | JointEntityExtractor) -> str:
+    # Changes whenever the model, prompt or response schema behind an extractor does, so its chunks are redone.
+    return content_hash(":".join((settings.OPENAI_MODEL_NAME,
+                                  schema_hash(extractor.response_format),
+                                  extractor.sys_prompt_template)))[:16]
+
+
+class ChunkLedger:
+    """
+    Tracks which (chunk, extractor version) pairs of a candidate's urls have already had their entities committed.
+    Chunks are written to the ledger in the same transaction as their url's entities, so a crashed job redoes exactly
+    the chunks whose results were lost.
+
+    Without a `candidate_id`, nothing counts as processed and nothing is recorded.
+    """
+    def __init__(self, candidate_id: int | None = None, urls: Sequence[str] = ()):
+        self.candidate_id = candidate_id
+        self._processed: set[tuple[str, str, str]] = set()  # (url, chunk hash, extraction version)
+        self._pending: dict[str, list[dict]] = {}
+        if candidate_id is not None and urls:
+            with Session(engine) as session:
+                rows = session.exec(
+                    select(ProcessedChunk.url, ProcessedChunk.chunk_hash, ProcessedChunk.extraction_version)
+                    .where(ProcessedChunk.candidate_id == candidate_id, ProcessedChunk.url.in_(urls))
+                ).all()
+            self._processed.update(tuple(row) for row in rows)
+
+    def is_processed(self, url: str, chunk: str, version: str) -> bool:
+        return (url, content_hash(chunk), version) in self._processed
+
+    def add_pending(self, url: str, text: str, chunks: list[str], version: str) -> None:
+        article_hash = content_hash(text)
+        self._pending.setdefault(url, []).extend(
+            {
+                "candidate_id": self.candidate_id,
+                "url": url,
+                "content_hash": article_hash,
+                "chunk_hash": content_hash(chunk),
+                "extraction_version": version,
+            }
+            for chunk in chunks
+        )
+
+    def discard(self, url: str) -> None:
+        # For a url left unfinished, so that its chunks are extracted again next time.
+        self._pending.pop(url, None)
+
+    def add_to_session(self, session: Session, url: str) -> None:
+        # Adds without committing, in the session that adds the url's entities.
+        chunk_jsons = self._pending.pop(url, [])
+        if self.candidate_id is None or not chunk_jsons:
+            return
+        # Overlapping resubmissions of the same url may race to record the same chunks; either record will do.
+        session.exec(insert(ProcessedChunk).on_conflict_do_nothing(), params=chunk_jsons)
+        self._processed.update((c["url"], c["chunk_hash"], c["extraction_version"]) for c in chunk_jsons)
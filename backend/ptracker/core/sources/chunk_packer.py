@@ -0,0 +1,44 @@
+from ptracker.core import constants
+from ptracker.core.settings import settings
+from ptracker.core.utils import estimate_tokens
+
+# Tokens for the `<chunk id="...">` wrapper around each packed chunk.
+_CHUNK_WRAPPER_TOKENS = 12
+
+
+def packed_output_tokens(chunk_count: int) -> int:
+    # Every packed chunk gets the completion budget it would have had alone, up to what the model can emit.
+    return min(constants.EXTRACTION_MAX_TOKENS * chunk_count, settings.LLM_MAX_OUTPUT_TOKENS)
+
+
+def format_packed_extracts(extracts: list[str]) -> str:
+    return "\n\n".join(f'<chunk id="{chunk_id}">\n{extract}\n</chunk>' for chunk_id, extract in enumerate(extracts))
+
+
+class ChunkPacker:
+    """
+    Groups consecutive chunks into packs that share one LLM request, so the system prompt is sent once per pack
+    rather than once per chunk. A pack grows until it hits `max_chunks`, runs out of completion budget (each chunk
+    needs room for its own results), or would no longer fit in the model's context alongside the system prompt.
+    """
+    def __init__(
+            self,
+            max_chunks: int = settings.EXTRACTION_PACK_MAX_CHUNKS,
+            context_tokens: int = settings.LLM_CONTEXT_TOKENS,
+    ):
+        self.max_chunks = max(1, min(max_chunks, settings.LLM_MAX_OUTPUT_TOKENS // constants.EXTRACTION_MAX_TOKENS))
+        self.context_tokens = context_tokens
+
+    def pack(self, chunks: list[str], prompt_tokens: int) -> list[list[int]]:
+        # Returns the chunk indices in each pack, in order.
+        input_budget = self.context_tokens - prompt_tokens - packed_output_tokens(self.max_chunks)
+        packs: list[list[int]] = []
+        pack_tokens = 0
+        for idx, chunk in enumerate(chunks):
+            chunk_tokens = estimate_tokens(chunk) + _CHUNK_WRAPPER_TOKENS
+            if not packs or len(packs[-1]) >= self.max_chunks or pack_tokens + chunk_tokens > input_budget:
+                packs.append([])
+                pack_tokens = 0
+            packs[-1].append(idx)
+            pack_tokens += chunk_tokens
+        return packs
@@ -1,31 +1,38 @@
 from abc import ABC, abstractmethod
 from datetime import datetime
-from openai import OpenAI, LengthFinishReasonError
-from pydantic import BaseModel
-from sqlmodel import select, Session
+from openai import LengthFinishReasonError
+from pydantic import BaseModel, create_model
+from sqlmodel import insert, Session
 from typing import Any
 
+import functools
+
 from ptracker.api.models import (
     Action,
     Citation,
     Promise,
+    PromiseActionLink,
 )
 from ptracker.core import prompts
 from ptracker.core import constants
+from ptracker.core.changes import notify_candidate_changed
 from ptracker.core.db import engine
+from ptracker.core.dedup import deduplicate_by_embedding
+from ptracker.core.extraction_cache import ExtractionCache
 from ptracker.core.llm_utils import (
-    cosine_similarity,
-    fetch_actions_by_embedding,
-    fetch_promises_by_embedding,
-    get_action_embedding,
-    get_promise_embedding,
+    fetch_links_by_embedding,
+    fetch_nearest_neighbors,
+    get_action_embeddings,
+    get_promise_embeddings,
+    parse_chat_completion,
 )
 from ptracker.core.settings import settings
+from ptracker.core.sources.chunk_packer import format_packed_extracts, packed_output_tokens
 from ptracker.core.utils import get_logger
 
 logger = get_logger(__name__)
 
-client = OpenAI(api_key=settings.OPENAI_KEY)
+extraction_cache = ExtractionCache(path=settings.EXTRACTION_CACHE_PATH, max_bytes=settings.EXTRACTION_CACHE_MAX_BYTES)
 
 
 class LLMPromiseResponse(BaseModel):
@@ -46,12 +53,33 @@ class LLMActionResponse(BaseModel):
     actions: list[ActionInfo]
 
 
+class LLMPromiseAndActionResponse(BaseModel):
+    promises: list[LLMPromiseResponse]
+    actions: list[ActionInfo]
+
+
 class EntityExtractor(ABC):
+    # The prompt and schema of the extractor's LLM call, which packed extraction reuses for several chunks at once.
+    sys_prompt_template: str
+    response_format: type[BaseModel]
+
     @staticmethod
     @abstractmethod
     def get_entities_from_extract(extract: str, candidate_name: str, url: str) -> list[dict[str, Any]] | None:
         pass
 
+    @staticmethod
+    @abstractmethod
+    def entities_from_response(response: BaseModel, extract: str, url: str) -> list[dict[str, Any]] | None:
+        # Validate a parsed LLM response against the extract it came from, and turn it into entity jsons.
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def embed_entities(entity_jsons: list[dict]) -> None:
+        # Adds an "embedding" to every entity json, in as few requests as possible.
+        pass
+
     @staticmethod
     @abstractmethod
     def deduplicate_entities(entity_jsons: list[dict]) -> list[dict]:
@@ -59,9 +87,62 @@ class EntityExtractor(ABC):
 
     @staticmethod
     @abstractmethod
-    def add_entities_to_session(candidate_id: int, entity_jsons: list[dict]) -> None:
+    def add_entities_to_session(session: Session, candidate_id: int, entity_jsons: list[dict]) -> None:
+        # Adds without committing, so the caller commits a url's entities together with the record of their url.
         pass
 
+    @staticmethod
+    def _get_llm_response(
+            sys_prompt_template: str,
+            extract: str,
+            candidate_name: str,
+            response_format: type[BaseModel],
+            max_tokens: int = constants.EXTRACTION_MAX_TOKENS,
+    ) -> BaseModel | None:
+        cache_key = {
+            "model": settings.OPENAI_MODEL_NAME,
+            "prompt_template": sys_prompt_template,
+            "candidate_name": candidate_name,
+            "extract": extract,
+        }
+        if not settings.EXTRACTION_CACHE_BYPASS:
+            cached_response = extraction_cache.get(**cache_key, response_format=response_format)
+            if cached_response is not None:
+                return cached_response
+
+        messages = [
+            {"role": "system", "content": sys_prompt_template.replace("{{name}}", candidate_name)},
+            {"role": "user", "content": extract}
+        ]
+
+        try:
+            response = parse_chat_completion(messages=messages, response_format=response_format, max_tokens=max_tokens)
+        except LengthFinishReasonError:
+            return None  # Squash this for now.
+
+        parsed_response = response.choices[0].message.parsed
+        if parsed_response is not None:
+            # Cache the raw parse, before any filtering, so that changing our acceptance rules still replays for free.
+            extraction_cache.set(**cache_key, response=parsed_response)
+        return parsed_response
+
+    @staticmethod
+    def _drop_existing_duplicates(model: type[Promise] | type[Action], entity_jsons: list[dict]) -> list[dict]:
+        with Session(engine) as session:
+            nearest_neighbors = fetch_nearest_neighbors(session=session,
+                                                        model=model,
+                                                        embeddings=[e["embedding"] for e in entity_jsons])
+        # Regardless of length, existing entities take precedence.
+        return [
+            entity_json for entity_json, (_, distance) in zip(entity_jsons, nearest_neighbors)
+            if distance is None or distance >= constants.DUPLICATE_ENTITY_DIST_THRESHOLD
+        ]
+
+    @staticmethod
+    def _commitless_add_links(session: Session, link_jsons: list[dict]) -> None:
+        if link_jsons:
+            session.exec(insert(PromiseActionLink), params=link_jsons)
+
     @staticmethod
     def _commitless_add_citations(session: Session, citation_jsons: list[dict]) -> list[Citation]:
         citations = []
@@ -73,139 +154,124 @@ class EntityExtractor(ABC):
 
 
 class PromiseExtractor(EntityExtractor):
+    sys_prompt_template = prompts.PROMISE_EXTRACTION_SYSTEM_PROMPT
+    response_format = LLMPromiseResponse
+
     @staticmethod
     def get_entities_from_extract(extract: str, candidate_name: str, url: str) -> list[dict[str, Any]] | None:
-        sys_prompt_template = prompts.PROMISE_EXTRACTION_SYSTEM_PROMPT
-        messages = [
-            {"role": "system", "content": sys_prompt_template.replace("{{name}}", candidate_name)},
-            {"role": "user", "content": extract}
-        ]
-
-        try:
-            response = client.beta.chat.completions.parse(
-                model=settings.OPENAI_MODEL_NAME,
-                messages=messages,
-                max_tokens=1200,
-                temperature=0.7,
-                top_p=0.95,
-                frequency_penalty=0,
-                presence_penalty=0,
-                stop=None,
-                response_format=LLMPromiseResponse,
-            )
-        except LengthFinishReasonError:
-            return None  # Squash this for now.
-
-        raw_promise = response.choices[0].message.parsed
+        raw_promise = EntityExtractor._get_llm_response(
+            sys_prompt_template=PromiseExtractor.sys_prompt_template,
+            extract=extract,
+            candidate_name=candidate_name,
+            response_format=PromiseExtractor.response_format,
+        )
 
         if raw_promise is None:
             return None
+        return PromiseExtractor.entities_from_response(raw_promise, extract=extract, url=url)
 
-        if not raw_promise.is_promise or raw_promise.exact_quote not in extract:
-            logger.warning(
-                "Received response that was either not a promise or which did not adhere to our requirements. "
-                f"is_promise={raw_promise.is_promise} is_quote={raw_promise.exact_quote in extract}"
-            )
-            return None
+    @staticmethod
+    def entities_from_response(raw_promise: LLMPromiseResponse, extract: str, url: str) -> list[dict[str, Any]] | None:
+        return PromiseExtractor._entity_jsons_from_response([raw_promise], extract=extract, url=url) or None
 
-        # Truncate the citation extract, in case the quote is too long.
-        raw_promise.exact_quote = raw_promise.exact_quote[:settings.CITATION_EXTRACT_LENGTH]
-        logger.info(f"Extracted promise: {raw_promise.promise_text}")
-        logger.info(f"Verbatim extraction honored: {raw_promise.exact_quote in extract}")
-        logger.info(f"Article extract: {raw_promise.exact_quote}")
-        return [{
-            "_timestamp": datetime.now(),
-            "status": constants.PromiseStatus.PROGRESSING,
-            "text": raw_promise.promise_text,
-            "embedding": get_promise_embedding(raw_promise.promise_text),
-            "citations": [
-                {
-                    "date": datetime.now(),
-                    "extract": raw_promise.exact_quote,
-                    "url": url,
-                }
-            ]
-        }]
+    @staticmethod
+    def _entity_jsons_from_response(
+            raw_promises: list[LLMPromiseResponse],
+            extract: str,
+            url: str,
+    ) -> list[dict[str, Any]]:
+        formal_promise_jsons = []
+        for raw_promise in raw_promises:
+            if not raw_promise.is_promise or raw_promise.exact_quote not in extract:
+                logger.warning(
+                    "Received response that was either not a promise or which did not adhere to our requirements. "
+                    f"is_promise={raw_promise.is_promise} is_quote={raw_promise.exact_quote in extract}"
+                )
+                continue
+
+            # Truncate the citation extract, in case the quote is too long.
+            raw_promise.exact_quote = raw_promise.exact_quote[:settings.CITATION_EXTRACT_LENGTH]
+            logger.info(f"Extracted promise: {raw_promise.promise_text}")
+            logger.info(f"Verbatim extraction honored: {raw_promise.exact_quote in extract}")
+            logger.info(f"Article extract: {raw_promise.exact_quote}")
+            formal_promise_jsons.append({
+                "_timestamp": datetime.now(),
+                "status": constants.PromiseStatus.PROGRESSING,
+                "text": raw_promise.promise_text,
+                "citations": [
+                    {
+                        "date": datetime.now(),
+                        "extract": raw_promise.exact_quote,
+                        "url": url,
+                    }
+                ]
+            })
+        return formal_promise_jsons
+
+    @staticmethod
+    def embed_entities(entity_jsons: list[dict]) -> None:
+        promise_embeddings = get_promise_embeddings([p["text"] for p in entity_jsons])
+        for promise_json, promise_embedding in zip(entity_jsons, promise_embeddings):
+            promise_json["embedding"] = promise_embedding
 
     @staticmethod
     def deduplicate_entities(entity_jsons: list[dict]) -> list[dict]:
-        filtered_promise_dicts = []
-        promise_idxs = set(range(len(entity_jsons)))
-        while promise_idxs:
-            this_idx = promise_idxs.pop()
-            dup_idxs = [
-                other_idx for other_idx in promise_idxs if
-                cosine_similarity(entity_jsons[this_idx]['embedding'],
-                                  entity_jsons[other_idx]['embedding']) >= constants.DUPLICATE_ENTITY_SIM_THRESHOLD
-            ]
-            # Break ties in favor of longer promise text, for now.
-            longest_promise = entity_jsons[this_idx]
-            for idx in dup_idxs:
-                promise_idxs.remove(idx)
-                dup_promise = entity_jsons[idx]
-                if len(dup_promise['text']) > len(longest_promise['text']):
-                    longest_promise = dup_promise
-
-            with Session(engine) as session:
-                duplicate = session.exec(
-                    select(Promise).where(Promise.embedding.cosine_distance(longest_promise['embedding'])
-                                          < constants.DUPLICATE_ENTITY_DIST_THRESHOLD).limit(1)
-                ).first()
-                # Regardless of length, existing promises take precedence.
-                if duplicate is None:
-                    filtered_promise_dicts.append(longest_promise)
-        return filtered_promise_dicts
+        return EntityExtractor._drop_existing_duplicates(Promise, deduplicate_by_embedding(entity_jsons))
 
     @staticmethod
-    def add_entities_to_session(candidate_id: int, entity_jsons: list[dict]) -> None:
-        with Session(engine) as session:
-            new_promises = []
-            for promise_json in entity_jsons:
-                citation_jsons = promise_json["citations"]
-                assert len(citation_jsons) > 0, \
-                    "Unexpectedly got no citations for extracted promise. This is a system error."
-                citations = EntityExtractor._commitless_add_citations(session, citation_jsons)  # type: list[Citation]
-                promise = Promise.model_validate(promise_json, update={"candidate_id": candidate_id})
-                promise.citations = citations
-                # Optimize this?
-                promise.actions = fetch_actions_by_embedding(session=session,
-                                                             candidate_id=candidate_id,
-                                                             promise_embedding=promise.embedding)
-                new_promises.append(promise)
-                session.add(promise)
-            session.commit()
-        return
+    def add_entities_to_session(session: Session, candidate_id: int, entity_jsons: list[dict]) -> None:
+        new_promises = []
+        for promise_json in entity_jsons:
+            citation_jsons = promise_json["citations"]
+            assert len(citation_jsons) > 0, \
+                "Unexpectedly got no citations for extracted promise. This is a system error."
+            citations = EntityExtractor._commitless_add_citations(session, citation_jsons)  # type: list[Citation]
+            promise = Promise.model_validate(promise_json, update={"candidate_id": candidate_id})
+            promise.citations = citations
+            new_promises.append(promise)
+            session.add(promise)
+        session.flush()  # Assigns ids to the new promises, which the links below refer to.
+
+        links = fetch_links_by_embedding(session=session,
+                                         candidate_id=candidate_id,
+                                         model=Action,
+                                         ids=[p.id for p in new_promises],
+                                         embeddings=[p.embedding for p in new_promises])
+        EntityExtractor._commitless_add_links(session, [
+            {"promise_id": promise_id, "action_id": action_id} for promise_id, action_id in links
+        ])
+        notify_candidate_changed(session, candidate_id)
 
 
 class ActionExtractor(EntityExtractor):
+    sys_prompt_template = prompts.ACTION_EXTRACTION_SYSTEM_PROMPT
+    response_format = LLMActionResponse
+
     @staticmethod
     def get_entities_from_extract(extract: str, candidate_name: str, url: str) -> list[dict[str, Any]] | None:
-        sys_prompt_template = prompts.ACTION_EXTRACTION_SYSTEM_PROMPT
-        messages = [
-            {"role": "system", "content": sys_prompt_template.replace("{{name}}", candidate_name)},
-            {"role": "user", "content": extract}
-        ]
-
-        try:
-            response = client.beta.chat.completions.parse(
-                model=settings.OPENAI_MODEL_NAME,
-                messages=messages,
-                max_tokens=1200,
-                temperature=0.7,
-                top_p=0.95,
-                frequency_penalty=0,
-                presence_penalty=0,
-                stop=None,
-                response_format=LLMActionResponse,
-            )
-        except LengthFinishReasonError:
-            return None  # Squash this for now.
+        action_response_object = EntityExtractor._get_llm_response(
+            sys_prompt_template=ActionExtractor.sys_prompt_template,
+            extract=extract,
+            candidate_name=candidate_name,
+            response_format=ActionExtractor.response_format,
+        )
+
+        if action_response_object is None:
+            return None
+        return ActionExtractor.entities_from_response(action_response_object, extract=extract, url=url)
 
-        action_response_object = response.choices[0].message.parsed
-        action_info_list = action_response_object.actions
-        if not action_info_list:
+    @staticmethod
+    def entities_from_response(
+            action_response_object: LLMActionResponse,
+            extract: str,
+            url: str,
+    ) -> list[dict[str, Any]] | None:
+        if not action_response_object.actions:
             return None
+        return ActionExtractor._entity_jsons_from_response(action_response_object.actions, extract=extract, url=url)
 
+    @staticmethod
+    def _entity_jsons_from_response(action_info_list: list[ActionInfo], extract: str, url: str) -> list[dict[str, Any]]:
         formal_action_jsons = []
         for action_info in action_info_list:
             # Truncate the citation extract, in case the quote is too long.
@@ -221,7 +287,6 @@ class ActionExtractor(EntityExtractor):
             formal_action_json = {
                 "date": datetime.now(),
                 "text": action_info.action_text,
-                "embedding": get_action_embedding(action_info.action_text),
                 "citations": [
                     {
                         "date": datetime.now(),
@@ -233,51 +298,139 @@ class ActionExtractor(EntityExtractor):
             formal_action_jsons.append(formal_action_json)
         return formal_action_jsons
 
+    @staticmethod
+    def embed_entities(entity_jsons: list[dict]) -> None:
+        action_embeddings = get_action_embeddings([a["text"] for a in entity_jsons])
+        for action_json, action_embedding in zip(entity_jsons, action_embeddings):
+            action_json["embedding"] = action_embedding
+
     @staticmethod
     def deduplicate_entities(entity_jsons: list[dict]) -> list[dict]:
-        filtered_action_dicts = []
-        action_idxs = set(range(len(entity_jsons)))
-        while action_idxs:
-            this_idx = action_idxs.pop()
-            dup_idxs = [
-                other_idx for other_idx in action_idxs if
-                cosine_similarity(entity_jsons[this_idx]['embedding'],
-                                  entity_jsons[other_idx]['embedding']) >= constants.DUPLICATE_ENTITY_SIM_THRESHOLD
-            ]
-            # Break ties in favor of longer action text, for now.
-            longest_action = entity_jsons[this_idx]
-            for idx in dup_idxs:
-                action_idxs.remove(idx)
-                dup_action = entity_jsons[idx]
-                if len(dup_action['text']) > len(dup_action['text']):
-                    longest_action = dup_action
-
-            with Session(engine) as session:
-                duplicate = session.exec(
-                    select(Action).where(Action.embedding.cosine_distance(longest_action['embedding'])
-                                         < constants.DUPLICATE_ENTITY_DIST_THRESHOLD).limit(1)
-                ).first()
-                # Regardless of length, existing promises take precedence.
-                if duplicate is None:
-                    filtered_action_dicts.append(longest_action)
-        return filtered_action_dicts
+        return EntityExtractor._drop_existing_duplicates(Action, deduplicate_by_embedding(entity_jsons))
 
     @staticmethod
-    def add_entities_to_session(candidate_id: int, entity_jsons: list[dict]) -> None:
-        with Session(engine) as session:
-            new_actions = []
-            for action_json in entity_jsons:
-                citation_jsons = action_json["citations"]
-                assert len(citation_jsons) > 0, \
-                    "Unexpectedly got no citations for extracted action. This is a system error."
-                citations = EntityExtractor._commitless_add_citations(session, citation_jsons)  # type: list[Citation]
-                action = Action.model_validate(action_json, update={"candidate_id": candidate_id})
-                action.citations = citations
-                # Optimize this too?
-                action.promises = fetch_promises_by_embedding(session=session,
-                                                              candidate_id=candidate_id,
-                                                              action_embedding=action.embedding)
-                new_actions.append(action)
-                session.add(action)
-            session.commit()
-        return
+    def add_entities_to_session(session: Session, candidate_id: int, entity_jsons: list[dict]) -> None:
+        new_actions = []
+        for action_json in entity_jsons:
+            citation_jsons = action_json["citations"]
+            assert len(citation_jsons) > 0, \
+                "Unexpectedly got no citations for extracted action. This is a system error."
+            citations = EntityExtractor._commitless_add_citations(session, citation_jsons)  # type: list[Citation]
+            action = Action.model_validate(action_json, update={"candidate_id": candidate_id})
+            action.citations = citations
+            new_actions.append(action)
+            session.add(action)
+        session.flush()  # Assigns ids to the new actions, which the links below refer to.
+
+        links = fetch_links_by_embedding(session=session,
+                                         candidate_id=candidate_id,
+                                         model=Promise,
+                                         ids=[a.id for a in new_actions],
+                                         embeddings=[a.embedding for a in new_actions])
+        EntityExtractor._commitless_add_links(session, [
+            {"promise_id": promise_id, "action_id": action_id} for action_id, promise_id in links
+        ])
+        notify_candidate_changed(session, candidate_id)
+
+
+class JointEntityExtractor(ABC):
+    """
+    Extracts several entity types from an extract with a single LLM call, instead of one call per type. Each type is
+    still deduplicated and committed by its own registered `EntityExtractor`.
+    """
+    entities: tuple[type, ...]
+    sys_prompt_template: str
+    response_format: type[BaseModel]
+
+    @staticmethod
+    @abstractmethod
+    def get_entities_from_extract(
+            extract: str,
+            candidate_name: str,
+            url: str,
+    ) -> dict[type, list[dict[str, Any]]] | None:
+        pass
+
+    @staticmethod
+    @abstractmethod
+    def entities_from_response(response: BaseModel, extract: str, url: str) -> dict[type, list[dict[str, Any]]]:
+        pass
+
+
+class PromiseActionExtractor(JointEntityExtractor):
+    entities = (Promise, Action)
+    sys_prompt_template = prompts.PROMISE_AND_ACTION_EXTRACTION_SYSTEM_PROMPT
+    response_format = LLMPromiseAndActionResponse
+
+    @staticmethod
+    def get_entities_from_extract(
+            extract: str,
+            candidate_name: str,
+            url: str,
+    ) -> dict[type, list[dict[str, Any]]] | None:
+        response_object = EntityExtractor._get_llm_response(
+            sys_prompt_template=PromiseActionExtractor.sys_prompt_template,
+            extract=extract,
+            candidate_name=candidate_name,
+            response_format=PromiseActionExtractor.response_format,
+        )
+
+        if response_object is None:
+            return None
+        return PromiseActionExtractor.entities_from_response(response_object, extract=extract, url=url)
+
+    @staticmethod
+    def entities_from_response(
+            response_object: LLMPromiseAndActionResponse,
+            extract: str,
+            url: str,
+    ) -> dict[type, list[dict[str, Any]]]:
+        return {
+            Promise: PromiseExtractor._entity_jsons_from_response(response_object.promises, extract=extract, url=url),
+            Action: ActionExtractor._entity_jsons_from_response(response_object.actions, extract=extract, url=url),
+        }
+
+
+@functools.cache
+def _packed_response_format(response_format: type[BaseModel]) -> type[BaseModel]:
+    # Wraps an extractor's schema so that one response carries a result per chunk, tagged with that chunk's id.
+    chunk_result = create_model(f"{response_format.__name__}ChunkResult",
+                                chunk_id=(int, ...),
+                                result=(response_format, ...))
+    return create_model(f"Packed{response_format.__name__}", results=(list[chunk_result], ...))
+
+
+def get_entities_from_extracts(
+        extractor: EntityExtractor | JointEntityExtractor,
+        extracts: list[str],
+        candidate_name: str,
+        url: str,
+) -> list[list[dict[str, Any]] | dict[type, list[dict[str, Any]]] | None]:
+    """
+    Run an extractor over several chunks with a single LLM request. Returns, per chunk and in order, what
+    `get_entities_from_extract` would have returned for it; each chunk's result is verified against that chunk alone.
+    """
+    packed_response = EntityExtractor._get_llm_response(
+        sys_prompt_template=extractor.sys_prompt_template + prompts.PACKED_EXTRACTION_INSTRUCTIONS,
+        extract=format_packed_extracts(extracts),
+        candidate_name=candidate_name,
+        response_format=_packed_response_format(extractor.response_format),
+        max_tokens=packed_output_tokens(len(extracts)),
+    )
+
+    entities_per_extract = [None] * len(extracts)
+    if packed_response is None:
+        return entities_per_extract
+
+    answered = set()
+    for chunk_result in packed_response.results:
+        chunk_id = chunk_result.chunk_id
+        if not 0 <= chunk_id < len(extracts) or chunk_id in answered:
+            logger.warning(f"Received an unexpected or repeated result for chunk {chunk_id} of a pack of "
+                           f"{len(extracts)} chunks from {url}; ignoring it.")
+            continue
+        answered.add(chunk_id)
+        entities_per_extract[chunk_id] = extractor.entities_from_response(chunk_result.result,
+                                                                          extract=extracts[chunk_id],
+                                                                          url=url)
+    return entities_per_extract
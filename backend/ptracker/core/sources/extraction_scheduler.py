@@ -0,0 +1,142 @@
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from openai import RateLimitError
+from typing import Any, Generator, Hashable, Iterable, Sequence
+
+import threading
+
+from ptracker.core.settings import settings
+from ptracker.core.sources.entity_extractor import EntityExtractor, get_entities_from_extracts, JointEntityExtractor
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+EntityJsons = dict[type, list[dict[str, Any]]]
+
+
+def _is_joint_extractor(extractor: EntityExtractor | JointEntityExtractor) -> bool:
+    # Extractors may be registered as classes as well as instances.
+    extractor_type = extractor if isinstance(extractor, type) else type(extractor)
+    return issubclass(extractor_type, JointEntityExtractor)
+
+
+@dataclass
+class ExtractionTask:
+    entities: tuple[type, ...]  # A single entity, unless `extractor` is a joint extractor.
+    extractor: EntityExtractor | JointEntityExtractor
+    extracts: list[str]  # More than one extract when chunks are packed into a single request.
+    chunk_idxs: list[int]
+    url: str
+    candidate_name: str
+
+
+class ExtractionScheduler:
+    """
+    Runs chunk x extractor LLM calls on a bounded thread pool. Request and token budgets are enforced by the shared
+    rate limiter in `llm_utils`; this class only bounds how many calls are in flight and how many are queued, so that
+    a lazily generated stream of tasks is never materialized all at once.
+
+    A task still rate limited once its retries run out yields None instead of its entities, rather than failing
+    every other task along with it; its url is then left for the job's next attempt.
+
+    Once `stop` is set, no more results are yielded and queued calls are cancelled; only those already in flight
+    are waited for.
+    """
+    def __init__(self, max_concurrency: int = settings.LLM_MAX_CONCURRENCY, stop: threading.Event | None = None):
+        self.max_concurrency = max_concurrency
+        self.max_pending = max_concurrency * 2
+        self.stop = stop
+
+    def _stopped(self) -> bool:
+        return self.stop is not None and self.stop.is_set()
+
+    @staticmethod
+    def _run_task(task: ExtractionTask) -> EntityJsons | None:
+        try:
+            return ExtractionScheduler._extract(task)
+        except RateLimitError as e:
+            logger.warning(f"Still rate limited after {settings.LLM_MAX_RETRIES} tries on chunks {task.chunk_idxs} of "
+                           f"{task.url}; leaving them for a retry. {e}")
+            return None
+
+    @staticmethod
+    def _extract(task: ExtractionTask) -> EntityJsons:
+        if len(task.extracts) == 1:
+            results = [task.extractor.get_entities_from_extract(extract=task.extracts[0],
+                                                                candidate_name=task.candidate_name,
+                                                                url=task.url)]
+        else:
+            results = get_entities_from_extracts(task.extractor,
+                                                 extracts=task.extracts,
+                                                 candidate_name=task.candidate_name,
+                                                 url=task.url)
+
+        joint = _is_joint_extractor(task.extractor)
+        entity_jsons: EntityJsons = {entity: [] for entity in task.entities}
+        for result in results:
+            for entity, entity_dict_collection in ((result if joint else {task.entities[0]: result}) or {}).items():
+                entity_jsons[entity].extend(entity_dict_collection or [])
+        return entity_jsons
+
+    def run(
+            self,
+            tasks: Iterable[ExtractionTask]
+    ) -> Generator[tuple[ExtractionTask, EntityJsons | None], None, None]:
+        # Results are yielded in completion order, not submission order.
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="extract") as pool:
+            pending: dict[Future, ExtractionTask] = {}
+            try:
+                for task in tasks:
+                    if self._stopped():
+                        return
+                    if len(pending) >= self.max_pending:
+                        done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                        for future in done:
+                            yield pending.pop(future), future.result()
+                    pending[pool.submit(ExtractionScheduler._run_task, task)] = task
+
+                while pending and not self._stopped():
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield pending.pop(future), future.result()
+            finally:
+                # If stopped, or if the caller stops early, don't start the calls still queued.
+                for future in pending:
+                    future.cancel()
+
+    def run_grouped(
+            self,
+            task_groups: Iterable[tuple[Hashable, Sequence[ExtractionTask]]]
+    ) -> Generator[tuple[Hashable, list[tuple[ExtractionTask, EntityJsons | None]]], None, None]:
+        # Tasks from different groups share the pool, but each `(key, tasks)` group is yielded as `(key, results)` as
+        # soon as its last task finishes, so callers can act on (e.g. commit) one group without waiting on the rest.
+        # Groups without any tasks are still yielded, with no results.
+        remaining: dict[int, int] = {}
+        results: dict[int, list] = {}
+        keys: dict[int, Hashable] = {}
+        group_of_task: dict[int, int] = {}
+        empty_group_keys: list[Hashable] = []
+
+        def flattened_tasks() -> Generator[ExtractionTask, None, None]:
+            for group_id, (key, group) in enumerate(task_groups):
+                if not group:
+                    empty_group_keys.append(key)
+                    continue
+                remaining[group_id] = len(group)
+                results[group_id] = []
+                keys[group_id] = key
+                for task in group:
+                    group_of_task[id(task)] = group_id
+                    yield task
+
+        for task, result in self.run(flattened_tasks()):
+            while empty_group_keys:
+                yield empty_group_keys.pop(0), []
+            group_id = group_of_task.pop(id(task))
+            results[group_id].append((task, result))
+            remaining[group_id] -= 1
+            if remaining[group_id] == 0:
+                del remaining[group_id]
+                yield keys.pop(group_id), results.pop(group_id)
+        while empty_group_keys:
+            yield empty_group_keys.pop(0), []
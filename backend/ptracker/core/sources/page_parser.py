@@ -0,0 +1,142 @@
+from concurrent.futures import ProcessPoolExecutor
+from typing import Generator, Iterable
+
+import multiprocessing
+import queue
+import threading
+
+from ptracker.core.content_extractor import extract_main_content, ContentReport
+from ptracker.core.settings import settings
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+_SLOT_POLL_SECONDS = 0.1
+
+_process_pools: dict[int, ProcessPoolExecutor] = {}
+_process_pools_lock = threading.Lock()
+
+
+def _get_process_pool(max_processes: int) -> ProcessPoolExecutor:
+    # Pools are reused across jobs, so parse processes are only started once per worker.
+    with _process_pools_lock:
+        if max_processes not in _process_pools:
+            # Spawn rather than fork: the calling process is full of threads (fetchers, LLM calls, the embedding
+            # batcher), and forking while one of them holds a lock can deadlock the child.
+            _process_pools[max_processes] = ProcessPoolExecutor(max_workers=max_processes,
+                                                                mp_context=multiprocessing.get_context("spawn"))
+        return _process_pools[max_processes]
+
+
+class PageParser:
+    """
+    Turns fetched pages into article text off the calling thread. lxml parsing and content scoring are CPU-bound, so
+    they run in a process pool where they neither hold the GIL against in-flight fetches and LLM calls nor cap a
+    worker at one core.
+    """
+    def __init__(self, max_processes: int = settings.PARSE_MAX_PROCESSES):
+        self.max_processes = max_processes
+        # Bound the pages being parsed or parsed but not yet taken by the caller, so neither a burst of fast fetches
+        # nor a caller slower than parsing (as LLM extraction is) piles up a whole job's pages in memory.
+        self.max_pending = 2 * max(max_processes, 1)
+
+    @staticmethod
+    def _log_report(url: str, text: str, report: ContentReport) -> None:
+        if not text:
+            logger.warning(f"Found no article text in the page fetched from {url}; it could not be parsed or is empty.")
+            return
+        logger.info(f"Kept ~{report.content_tokens} of ~{report.page_tokens} tokens of page text from {url} "
+                    f"({report.savings:.0%} boilerplate removed).")
+
+    def _parse_inline(
+            self,
+            pages: Iterable[tuple[str, str | None]]
+    ) -> Generator[tuple[str, str | None], None, None]:
+        for url, html in pages:
+            if not html:
+                yield url, None
+                continue
+            text, report = extract_main_content(html)
+            self._log_report(url, text, report)
+            yield url, text
+
+    def parse_all(self, pages: Iterable[tuple[str, str | None]]) -> Generator[tuple[str, str | None], None, None]:
+        """
+        Yield `(url, text)` for every `(url, html)` page, in the order parsing finishes; pages that failed to fetch
+        come through with `None` text.
+        """
+        if self.max_processes == 0:
+            yield from self._parse_inline(pages)
+            return
+
+        pool = _get_process_pool(self.max_processes)
+        results: queue.Queue = queue.Queue()
+        slots = threading.BoundedSemaphore(self.max_pending)
+        stop = threading.Event()
+
+        def acquire_slot() -> bool:
+            # Wait for the caller to take a parsed page, unless it has stopped taking them altogether.
+            while not slots.acquire(timeout=_SLOT_POLL_SECONDS):
+                if stop.is_set():
+                    return False
+            return True
+
+        def feed() -> None:
+            # Pull pages on a separate thread, so pages that finish parsing are handed back while the next fetch is
+            # still in flight.
+            page_count = 0
+            try:
+                for url, html in pages:
+                    if stop.is_set():
+                        break
+                    page_count += 1
+                    if not html:
+                        results.put((url, None))
+                        continue
+                    if not acquire_slot():
+                        break
+                    future = pool.submit(extract_main_content, html)
+                    future.add_done_callback(lambda f, url=url: results.put((url, f)))
+            except Exception as e:
+                results.put(e)
+            finally:
+                # Stop the page source too, so it doesn't go on fetching pages nobody will parse.
+                close = getattr(pages, "close", None)
+                if close is not None:
+                    close()
+                results.put(page_count)
+
+        feeder = threading.Thread(target=feed, name="parse-feed", daemon=True)
+        feeder.start()
+
+        received = 0
+        expected = None
+        try:
+            while expected is None or received < expected:
+                item = results.get()
+                if isinstance(item, Exception):
+                    raise item
+                if isinstance(item, int):
+                    expected = item
+                    continue
+
+                received += 1
+                url, future = item
+                if future is None:
+                    yield url, None
+                    continue
+                try:
+                    text, report = future.result()
+                except Exception as e:
+                    logger.warning(f"Failed to parse the page fetched from {url}: {e}")
+                    text = None
+                else:
+                    self._log_report(url, text, report)
+                yield url, text
+                # Only once the caller is done with this page's text may another page take its place.
+                slots.release()
+        finally:
+            # If the caller stops early, let the feeder wind down instead of fetching and parsing the rest, and wait
+            # for it, so it's done with the page source before the caller tears that down.
+            stop.set()
+            feeder.join()
@@ -0,0 +1,88 @@
+from dataclasses import dataclass
+from typing import Iterable
+
+import re
+
+from ptracker.core.settings import settings
+
+# Relevance scores, from surest to least sure that a chunk is about the candidate.
+NAME_SCORE = 1.0  # Full name or an alias.
+SURNAME_SCORE = 0.75
+PRONOUN_SCORE = 0.5  # A third-person pronoun shortly after a chunk that named the candidate.
+
+_NAME_SUFFIXES = {"jr", "sr", "ii", "iii", "iv"}
+_THIRD_PERSON_PRONOUNS = re.compile(r"\b(he|him|his|she|her|hers|they|them|their)\b", re.I)
+
+
+@dataclass
+class RelevanceStats:
+    chunks: int = 0
+    skipped: int = 0
+
+    def add(self, other: "RelevanceStats") -> None:
+        self.chunks += other.chunks
+        self.skipped += other.skipped
+
+
+def _phrase_pattern(phrases: Iterable[str]) -> re.Pattern | None:
+    phrases = sorted({phrase.strip() for phrase in phrases if phrase.strip()}, key=len, reverse=True)
+    if not phrases:
+        return None
+    return re.compile(r"(?<!\w)(" + "|".join(re.escape(phrase) for phrase in phrases) + r")(?!\w)", re.I)
+
+
+class RelevanceFilter:
+    """
+    Cheap lexical screen for chunks that cannot contain the candidate's promises or actions, run before any LLM call.
+
+    Each chunk scores `NAME_SCORE` if it names the candidate (or an alias), `SURNAME_SCORE` if it only uses their
+    surname, `PRONOUN_SCORE` if it only has third-person pronouns within `pronoun_window` chunks after one that named
+    them, and 0 otherwise. Chunks scoring below `1 - recall` are skipped: `recall=1` keeps every chunk, `recall=0.9`
+    skips only chunks with no trace of the candidate, `recall=0.4` keeps only chunks that name them, and `recall=0.2`
+    only those that use their full name.
+    """
+    def __init__(
+            self,
+            candidate_name: str,
+            aliases: Iterable[str] = (),
+            recall: float = settings.RELEVANCE_FILTER_RECALL,
+            pronoun_window: int = settings.RELEVANCE_FILTER_PRONOUN_WINDOW,
+    ):
+        assert 0 <= recall <= 1, "Relevance filter recall must be between 0 and 1."
+        self.min_score = 1 - recall
+        self.pronoun_window = pronoun_window
+
+        name_parts = [part for part in re.split(r"[\s,]+", candidate_name)
+                      if part and part.strip(".").lower() not in _NAME_SUFFIXES]
+        # Middle names and initials are often left out, e.g. "Kamala Harris" for "Kamala D. Harris".
+        first_last = [f"{name_parts[0]} {name_parts[-1]}"] if len(name_parts) > 2 else []
+        self.name_pattern = _phrase_pattern([candidate_name, " ".join(name_parts), *first_last, *aliases])
+        # A one-letter "surname" (e.g. a middle initial left over from an odd name format) would match everywhere.
+        self.surname_pattern = _phrase_pattern(name_parts[-1:] if len(name_parts) > 1 and len(name_parts[-1]) > 1
+                                               else [])
+
+    def score(self, chunk: str, chunks_since_mention: int | None) -> float:
+        if self.name_pattern is not None and self.name_pattern.search(chunk):
+            return NAME_SCORE
+        if self.surname_pattern is not None and self.surname_pattern.search(chunk):
+            return SURNAME_SCORE
+        if chunks_since_mention is not None and chunks_since_mention <= self.pronoun_window \
+                and _THIRD_PERSON_PRONOUNS.search(chunk):
+            return PRONOUN_SCORE
+        return 0.0
+
+    def filter(self, chunks: list[str]) -> tuple[list[int], RelevanceStats]:
+        # Returns the indices of the chunks worth sending to the LLM, in order.
+        if self.min_score <= 0:
+            return list(range(len(chunks))), RelevanceStats(chunks=len(chunks))
+
+        kept = []
+        chunks_since_mention = None
+        for idx, chunk in enumerate(chunks):
+            chunks_since_mention = chunks_since_mention + 1 if chunks_since_mention is not None else None
+            score = self.score(chunk, chunks_since_mention)
+            if score >= SURNAME_SCORE:
+                chunks_since_mention = 0
+            if score >= self.min_score:
+                kept.append(idx)
+        return kept, RelevanceStats(chunks=len(chunks), skipped=len(chunks) - len(kept))
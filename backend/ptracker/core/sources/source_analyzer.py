@@ -1,79 +1,309 @@
-from bs4 import BeautifulSoup
-from typing import Generator
+from contextlib import closing
+from sqlmodel import Session
+from typing import Callable, Generator, Sequence
 
-import requests
+import threading
 
 from ptracker.api.models import Action, Candidate, Promise
+from ptracker.core import prompts
+from ptracker.core.db import engine
+from ptracker.core.dedup import merge_identical_entities, simhash
+from ptracker.core.utils import estimate_tokens, get_logger
 from ptracker.core.settings import settings
-from ptracker.core.utils import get_logger
-from ptracker.core.sources import ActionExtractor, EntityExtractor, PromiseExtractor
+from ptracker.core.sources import (
+    ActionExtractor,
+    EntityExtractor,
+    JointEntityExtractor,
+    PromiseActionExtractor,
+    PromiseExtractor,
+)
+from ptracker.core.sources.article_deduplicator import ArticleDeduplicator
+from ptracker.core.sources.article_fetcher import ArticleFetcher
+from ptracker.core.sources.chunk_ledger import ChunkLedger, content_hash, extraction_version
+from ptracker.core.sources.chunk_packer import ChunkPacker
+from ptracker.core.sources.extraction_scheduler import ExtractionScheduler, ExtractionTask
+from ptracker.core.sources.page_parser import PageParser
+from ptracker.core.sources.relevance_filter import RelevanceFilter, RelevanceStats
+from ptracker.core.sources.text_chunker import TextChunker
 
 logger = get_logger(__name__)
 
 
+class ExtractionDeferred(Exception):
+    pass
+
+
+class ExtractionStopped(Exception):
+    pass
+
+
 class SourceAnalyzer:
     def __init__(self):
         self.entity_registry: dict[type, EntityExtractor] = {}
+        self.joint_extractors: list[JointEntityExtractor] = []
+        # Running totals across every url this analyzer has seen, e.g. to weigh skipped chunks against eval recall,
+        # and each url's share of them until it is committed.
+        self.relevance_stats = RelevanceStats()
+        self.url_relevance_stats: dict[str, RelevanceStats] = {}
+        # Urls with chunks still rate limited once their retries ran out; they are left for the job's next attempt.
+        self.deferred_urls: set[str] = set()
+        # Urls that failed to fetch or held no article text, with the reason; retrying them would be no use.
+        self.failed_urls: dict[str, str] = {}
 
     def register_entity(self, entity: type, extractor: EntityExtractor):
         self.entity_registry[entity] = extractor
 
-    @staticmethod
-    def _get_article_text(url: str) -> str | None:
-        response = requests.get(url)
-        if response.status_code == 200:  # brittle?
-            text = BeautifulSoup(response.text, "html.parser").get_text()
-            return text
-        else:
-            logger.warning(f"In trying to visit '{url}' as part of promise extraction flow, "
-                           f"received unhappy status code {response.status_code}.")
-            return None
-
-    @staticmethod
-    def _chunked_text_iterator(text: str) -> Generator[str, None, None]:
-        for idx in range(0, len(text), settings.CITATION_EXTRACT_LENGTH):
-            yield text[idx:idx + settings.CITATION_EXTRACT_LENGTH * 2]
+    def register_joint_extractor(self, extractor: JointEntityExtractor):
+        # The joint extractor only replaces per-entity extraction; each entity's registered extractor still
+        # deduplicates and commits what it finds.
+        unregistered = [entity.__name__ for entity in extractor.entities if entity not in self.entity_registry]
+        assert not unregistered, f"Register extractors for {unregistered} before a joint extractor covering them."
+        self.joint_extractors.append(extractor)
 
-    def construct_entity_jsons(self, candidate_name: str, urls: list[str]) -> dict[type, list]:
-        entity_jsons = {}
-        logger.info(f"Received {len(urls)} urls for candidate {candidate_name}. Beginning entity extraction; "
-                    f"looping through them now.")
-        for url in urls:
-            text = SourceAnalyzer._get_article_text(url)
-            if not text:
-                logger.warning(f"Failed to extract text from {url}.")
-                continue
+    def _extraction_plan(self) -> list[tuple[tuple[type, ...], EntityExtractor | JointEntityExtractor]]:
+        # Which extractor to call on each chunk, and for which entities.
+        plan = [(tuple(extractor.entities), extractor) for extractor in self.joint_extractors]
+        jointly_extracted = {entity for entities, _ in plan for entity in entities}
+        plan.extend(((entity,), extractor) for entity, extractor in self.entity_registry.items()
+                    if entity not in jointly_extracted)
+        return plan
+
+    def extraction_version(self) -> str:
+        # Changes whenever any extractor in use would extract differently.
+        return content_hash(":".join(sorted(extraction_version(extractor) for _, extractor in self._extraction_plan())))
+
+    def _extraction_task_groups(
+            self,
+            candidate_name: str,
+            urls: list[str],
+            deduplicator: ArticleDeduplicator,
+            ledger: ChunkLedger,
+            aliases: Sequence[str] = (),
+    ) -> Generator[tuple[str, list[ExtractionTask]], None, None]:
+        # One group of chunk pack x extractor tasks per successfully fetched url that isn't a near-duplicate. Unchanged
+        # pages and chunks already in the ledger add no tasks.
+        chunker = TextChunker()
+        parser = PageParser()
+        packer = ChunkPacker()
+        relevance_filter = RelevanceFilter(candidate_name, aliases=aliases)
+        packed_instruction_tokens = estimate_tokens(prompts.PACKED_EXTRACTION_INSTRUCTIONS)
+        plan = [
+            (entities,
+             extractor,
+             estimate_tokens(extractor.sys_prompt_template) + packed_instruction_tokens,
+             extraction_version(extractor))
+            for entities, extractor in self._extraction_plan()
+        ]
+
+        unchanged_urls = set()
+        fetch_errors = {}
+
+        def fetched_pages() -> Generator[tuple[str, str | None], None, None]:
+            for page in fetcher.fetch_all(urls, validators=deduplicator.validators()):
+                if page.not_modified:
+                    unchanged_urls.add(page.url)
+                elif page.html:
+                    deduplicator.update_validators(page.url, etag=page.etag, last_modified=page.last_modified)
+                else:
+                    fetch_errors[page.url] = page.error
+                yield page.url, page.html
+
+        # Close the parser before the fetcher, so it stops pulling pages before the fetcher's session is closed.
+        with ArticleFetcher() as fetcher, closing(parser.parse_all(fetched_pages())) as parsed_pages:
+            for url, text in parsed_pages:
+                if url in unchanged_urls:
+                    logger.info(f"{url} is unchanged since it was last processed; skipping it.")
+                    yield url, []
+                    continue
+                if not text:  # Already logged, by the fetcher if the fetch failed or else by the parser.
+                    self.failed_urls[url] = (f"fetch failed: {fetch_errors[url]}" if url in fetch_errors
+                                             else "no article text found in the page")
+                    yield url, []
+                    continue
+                if not deduplicator.check(url, text, fingerprint=simhash(text)):
+                    continue
 
-            for idx, extract in enumerate(SourceAnalyzer._chunked_text_iterator(text)):
-                for entity in self.entity_registry:
-                    entity_dict_collection = self.entity_registry[entity].get_entities_from_extract(
-                        extract=extract,
-                        candidate_name=candidate_name,
-                        url=url
+                chunks, chunking_stats = chunker.chunk(text)
+                logger.info(f"Split {url} into {chunking_stats.chunks} chunks totalling "
+                            f"~{chunking_stats.chunk_tokens} tokens (~{chunking_stats.text_tokens} tokens of text).")
+
+                relevant_idxs, relevance_stats = relevance_filter.filter(chunks)
+                self.relevance_stats.add(relevance_stats)
+                self.url_relevance_stats[url] = relevance_stats
+                if relevance_stats.skipped:
+                    logger.info(f"Skipped {relevance_stats.skipped} of {relevance_stats.chunks} chunks of {url} that "
+                                f"do not appear to be about {candidate_name}.")
+
+                tasks = []
+                for entities, extractor, prompt_tokens, version in plan:
+                    new_idxs = [idx for idx in relevant_idxs if not ledger.is_processed(url, chunks[idx], version)]
+                    if len(new_idxs) < len(relevant_idxs):
+                        logger.info(f"Skipping {len(relevant_idxs) - len(new_idxs)} chunks of {url} that were "
+                                    f"already extracted for {[entity.__name__ for entity in entities]}.")
+                    new_chunks = [chunks[idx] for idx in new_idxs]
+                    ledger.add_pending(url, text, new_chunks, version=version)
+                    tasks.extend(
+                        ExtractionTask(entities=entities,
+                                       extractor=extractor,
+                                       extracts=[new_chunks[pos] for pos in pack],
+                                       chunk_idxs=[new_idxs[pos] for pos in pack],
+                                       url=url,
+                                       candidate_name=candidate_name)
+                        for pack in packer.pack(new_chunks, prompt_tokens=prompt_tokens)
                     )
+                yield url, tasks
+
+            stats = fetcher.stats
+            logger.info(f"Fetched {stats.pages} pages ({stats.failed} failed, {stats.size} bytes) for {candidate_name}; "
+                        f"fetch latency p50 {stats.percentile(0.5):.2f}s, p95 {stats.percentile(0.95):.2f}s, "
+                        f"max {stats.percentile(1.0):.2f}s.")
 
+    def stream_entity_jsons(
+            self,
+            candidate_name: str,
+            urls: list[str],
+            deduplicator: ArticleDeduplicator | None = None,
+            ledger: ChunkLedger | None = None,
+            stop: threading.Event | None = None,
+            aliases: Sequence[str] = (),
+    ) -> Generator[tuple[str, dict[type, list]], None, None]:
+        # Near-duplicates of articles the deduplicator has seen are skipped, and left in its `duplicates`. Chunks in the
+        # ledger are skipped too; the caller commits the ledger for each url once its entities are committed. Urls
+        # that failed come through with no entities, and are listed in `failed_urls`.
+        logger.info(f"Received {len(urls)} urls for candidate {candidate_name}. Beginning entity extraction; "
+                    f"streaming through them now.")
+        scheduler = ExtractionScheduler(stop=stop)
+        deduplicator = deduplicator if deduplicator is not None else ArticleDeduplicator()
+        ledger = ledger if ledger is not None else ChunkLedger()
+        task_groups = self._extraction_task_groups(candidate_name, urls,
+                                                   deduplicator=deduplicator,
+                                                   ledger=ledger,
+                                                   aliases=aliases)
+        for url, url_results in scheduler.run_grouped(task_groups):
+            if any(task_entity_jsons is None for _, task_entity_jsons in url_results):
+                # Nothing of the url is kept, so a retry extracts it whole; the chunks that did get through are in
+                # the extraction cache by then, so only the rate-limited ones cost another LLM call.
+                logger.warning(f"Deferring {url} to a retry, since some of its chunks were rate limited.")
+                self.deferred_urls.add(url)
+                self.url_relevance_stats.pop(url, None)
+                ledger.discard(url)
+                continue
+            entity_jsons = {entity: [] for entity in self.entity_registry}
+            for task, task_entity_jsons in url_results:
+                for entity in task.entities:
+                    entity_dict_collection = task_entity_jsons.get(entity)
                     if not entity_dict_collection:
-                        logger.info(f"Did not extract any {entity.__name__} entities from chunk {idx} of {url} for "
-                                    f"candidate {candidate_name}.")
+                        logger.info(f"Did not extract any {entity.__name__} entities from chunks {task.chunk_idxs} "
+                                    f"of {task.url} for candidate {candidate_name}.")
                     else:
-                        entity_jsons[entity] = entity_jsons.get(entity, []) + entity_dict_collection
+                        entity_jsons[entity].extend(entity_dict_collection)
+
+            # Overlapping chunks often yield the same entity more than once; merge those before paying to embed them.
+            for entity, extractor in self.entity_registry.items():
+                merged_jsons = merge_identical_entities(entity_jsons[entity])
+                if len(merged_jsons) < len(entity_jsons[entity]):
+                    logger.info(f"Merged {len(entity_jsons[entity]) - len(merged_jsons)} identical {entity.__name__} "
+                                f"entities from {url} into others before embedding.")
+                if merged_jsons:
+                    extractor.embed_entities(merged_jsons)
+                entity_jsons[entity] = merged_jsons
+            yield url, entity_jsons
+
+    def construct_entity_jsons(self, candidate_name: str, urls: list[str]) -> dict[type, list]:
+        # Collects every url's entities in memory; the ingestion path streams through `stream_entity_jsons` instead.
+        entity_jsons = {entity: [] for entity in self.entity_registry}
+        for _, url_entity_jsons in self.stream_entity_jsons(candidate_name=candidate_name, urls=urls):
+            for entity, entity_dict_collection in url_entity_jsons.items():
+                entity_jsons[entity].extend(entity_dict_collection)
         return entity_jsons
 
-    def extract_entities(self, candidate: Candidate, urls: list[str]):
-        entity_jsons = self.construct_entity_jsons(candidate_name=candidate.name, urls=urls)
-        for entity in self.entity_registry:
-            this_entity_json_collection = entity_jsons[entity]
-            logger.info(f"Number of {entity.__name__} entities before deduplication: "
-                        f"{len(this_entity_json_collection)}.")
-            filtered_jsons = \
-                self.entity_registry[entity].deduplicate_entities(entity_jsons=this_entity_json_collection)
-            logger.info(f"Number of {entity.__name__} entities after deduplication: {len(filtered_jsons)}.")
-            self.entity_registry[entity].add_entities_to_session(candidate_id=candidate.id,
-                                                                 entity_jsons=filtered_jsons)
+    def extract_entities(
+            self,
+            candidate: Candidate,
+            urls: list[str],
+            on_url_complete: Callable[[Session, str, RelevanceStats], None] | None = None,
+            on_url_failed: Callable[[Session, str, str], None] | None = None,
+            stop: threading.Event | None = None,
+    ) -> None:
+        # Deduplicate and commit each url's entities as soon as that url is done, so memory stays flat however many
+        # urls a job has and results show up in the API while the job is still running. Duplicates across urls are
+        # still caught, since later urls are checked against the entities committed for earlier ones.
+        #
+        # Everything a url leaves behind (entities, citations, ledger chunks, its source article, and whatever
+        # `on_url_complete` records in the session, e.g. the url's relevance stats) is committed in one transaction,
+        # so a url is either done or untouched, and a retried job can safely skip the urls it finds done. Likewise,
+        # `on_url_failed` records a url that can't be extracted, and why, so that a retry skips it too.
+        #
+        # Setting `stop`, e.g. once another worker has taken the job over, abandons the rest of the urls.
+        deduplicator = ArticleDeduplicator(candidate_id=candidate.id, extraction_version=self.extraction_version())
+        ledger = ChunkLedger(candidate_id=candidate.id, urls=urls)
+        stream = self.stream_entity_jsons(candidate_name=candidate.name,
+                                          urls=urls,
+                                          deduplicator=deduplicator,
+                                          ledger=ledger,
+                                          stop=stop,
+                                          aliases=candidate.aliases)
+        # Closed explicitly on a stop, so queued fetches and LLM calls are cancelled right away.
+        with closing(stream):
+            for url, entity_jsons in stream:
+                if stop is not None and stop.is_set():
+                    break
+                with Session(engine) as session:
+                    for entity, extractor in self.entity_registry.items():
+                        this_entity_json_collection = entity_jsons[entity]
+                        logger.info(f"Number of {entity.__name__} entities from {url} before deduplication: "
+                                    f"{len(this_entity_json_collection)}.")
+                        filtered_jsons = extractor.deduplicate_entities(entity_jsons=this_entity_json_collection)
+                        logger.info(f"Number of {entity.__name__} entities from {url} after deduplication: "
+                                    f"{len(filtered_jsons)}.")
+                        if filtered_jsons:
+                            extractor.add_entities_to_session(session, candidate_id=candidate.id,
+                                                              entity_jsons=filtered_jsons)
+                    ledger.add_to_session(session, url)
+                    deduplicator.record(session, url)
+                    relevance_stats = self.url_relevance_stats.pop(url, RelevanceStats())
+                    if url in self.failed_urls:
+                        if on_url_failed is not None:
+                            on_url_failed(session, url, self.failed_urls[url])
+                    elif on_url_complete is not None:
+                        on_url_complete(session, url, relevance_stats)
+                    session.commit()
+
+        if stop is not None and stop.is_set():
+            raise ExtractionStopped(f"Stopped extraction for candidate {candidate.name} before all its urls were done.")
+
+        # By now every canonical copy extracted in this run is committed, so its duplicates can be cited on its
+        # entities. Duplicates of a deferred url wait for it, and are checked again on the retry.
+        for duplicate in deduplicator.duplicates:
+            if duplicate.canonical.url in self.deferred_urls:
+                continue
+            with Session(engine) as session:
+                citation_count = deduplicator.cite_duplicate(session, duplicate)
+                if on_url_complete is not None:
+                    on_url_complete(session, duplicate.url, RelevanceStats())
+                session.commit()
+            logger.info(f"Cited {duplicate.url} {citation_count} times, on entities extracted from its near-duplicate "
+                        f"{duplicate.canonical.url}.")
+
+        if self.deferred_urls:
+            # Fails the job after everything else is committed, so that it is retried for the deferred urls alone.
+            raise ExtractionDeferred(f"Deferred {len(self.deferred_urls)} urls whose chunks were rate limited.")
 
 
-def analyze_sources(candidate: Candidate, urls: list[str]) -> None:
+def analyze_sources(
+        candidate: Candidate,
+        urls: list[str],
+        on_url_complete: Callable[[Session, str, RelevanceStats], None] | None = None,
+        on_url_failed: Callable[[Session, str, str], None] | None = None,
+        stop: threading.Event | None = None,
+) -> None:
     analyzer = SourceAnalyzer()
     analyzer.register_entity(entity=Promise, extractor=PromiseExtractor())
     analyzer.register_entity(entity=Action, extractor=ActionExtractor())
-    analyzer.extract_entities(candidate=candidate, urls=urls)
+    if settings.JOINT_EXTRACTION:
+        analyzer.register_joint_extractor(PromiseActionExtractor())
+    analyzer.extract_entities(candidate=candidate,
+                              urls=urls,
+                              on_url_complete=on_url_complete,
+                              on_url_failed=on_url_failed,
+                              stop=stop)
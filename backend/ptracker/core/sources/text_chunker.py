@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+
+import re
+
+from ptracker.core import constants
+from ptracker.core.settings import settings
+from ptracker.core.utils import estimate_tokens
+
+# A sentence ends at terminal punctuation (plus any closing quotes/brackets) followed by whitespace; a paragraph
+# break ends one regardless of punctuation.
+_SENTENCE_END = re.compile(r"[.!?]+[\"'”’)\]]*(?=\s|$)|\n\s*\n")
+
+
+@dataclass
+class ChunkingStats:
+    chunks: int
+    chunk_tokens: int  # Tokens across all chunks, overlap included.
+    text_tokens: int  # Tokens in the text itself.
+
+
+class TextChunker:
+    """
+    Packs whole sentences into chunks of at most `max_tokens`, repeating up to `overlap_tokens` worth of trailing
+    sentences at the start of the next chunk. Chunks are verbatim slices of the input text, so quotes the LLM copies
+    out of a chunk can still be found in it.
+    """
+    def __init__(
+            self,
+            max_tokens: int = settings.CHUNK_MAX_TOKENS,
+            overlap_tokens: int = settings.CHUNK_OVERLAP_TOKENS,
+    ):
+        assert overlap_tokens < max_tokens, "Chunk overlap must be smaller than the chunk itself."
+        self.max_tokens = max_tokens
+        self.overlap_tokens = overlap_tokens
+
+    @staticmethod
+    def _strip_span(text: str, start: int, end: int) -> tuple[int, int]:
+        while start < end and text[start].isspace():
+            start += 1
+        while end > start and text[end - 1].isspace():
+            end -= 1
+        return start, end
+
+    def _split_long_span(self, text: str, start: int, end: int) -> list[tuple[int, int]]:
+        # A single "sentence" longer than the budget (e.g. a table flattened to text) gets cut on word boundaries.
+        max_chars = self.max_tokens * constants.CHARS_PER_TOKEN
+        spans = []
+        while end - start > max_chars:
+            cut = text.rfind(" ", start, start + max_chars)
+            cut = cut if cut > start else start + max_chars
+            spans.append(self._strip_span(text, start, cut))
+            start = cut
+        spans.append(self._strip_span(text, start, end))
+        return spans
+
+    def _sentence_spans(self, text: str) -> list[tuple[int, int]]:
+        boundaries = [match.end() for match in _SENTENCE_END.finditer(text)] + [len(text)]
+        spans = []
+        start = 0
+        for end in boundaries:
+            span_start, span_end = self._strip_span(text, start, end)
+            start = end
+            if span_start == span_end:
+                continue
+            if estimate_tokens(text[span_start:span_end]) > self.max_tokens:
+                spans.extend(self._split_long_span(text, span_start, span_end))
+            else:
+                spans.append((span_start, span_end))
+        return spans
+
+    def chunk(self, text: str) -> tuple[list[str], ChunkingStats]:
+        spans = self._sentence_spans(text)
+        span_tokens = [estimate_tokens(text[start:end]) for start, end in spans]
+
+        chunks = []
+        first = 0
+        while first < len(spans):
+            last = first + 1
+            tokens = span_tokens[first]
+            while last < len(spans) and tokens + span_tokens[last] <= self.max_tokens:
+                tokens += span_tokens[last]
+                last += 1
+            chunks.append(text[spans[first][0]:spans[last - 1][1]])
+            if last == len(spans):
+                break
+
+            # Start the next chunk a few whole sentences back, but always strictly after this chunk's start.
+            next_first = last
+            overlap = 0
+            while next_first - 1 > first and overlap + span_tokens[next_first - 1] <= self.overlap_tokens:
+                next_first -= 1
+                overlap += span_tokens[next_first]
+            first = next_first
+
+        stats = ChunkingStats(chunks=len(chunks),
+                              chunk_tokens=sum(estimate_tokens(chunk) for chunk in chunks),
+                              text_tokens=estimate_tokens(text))
+        return chunks, stats
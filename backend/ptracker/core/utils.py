@@ -3,6 +3,8 @@ from termcolor import colored
 
 import logging
 
+from ptracker.core import constants
+
 
 class ColorFormatter(logging.Formatter):
     log_colorer = {
@@ -30,3 +32,7 @@ def get_logger(name):
     handler.setFormatter(ColorFormatter())
     logger.addHandler(handler)
     return logger
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // constants.CHARS_PER_TOKEN + 1
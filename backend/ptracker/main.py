@@ -1,15 +1,31 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from starlette.middleware.cors import CORSMiddleware
 
 import colorama
 import logging
+import threading
 import uvicorn
 
+from ptracker.core.changes import listen_for_changes
 from ptracker.core.settings import settings
 from ptracker.api.main import api_router
+from ptracker.api.response_cache import response_cache, ResponseCacheMiddleware
 
 colorama.init(strip=False)
 
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    # Drop cached responses whenever another process (a worker, or another API process) commits a change.
+    stop = threading.Event()
+    listener = threading.Thread(target=listen_for_changes, args=(response_cache.invalidate, stop),
+                                name="change-listener", daemon=True)
+    listener.start()
+    yield
+    stop.set()
+
+
 controller = FastAPI(
     title=settings.PROJECT_NAME,
     description=settings.PROJECT_DESCRIPTION,
@@ -20,8 +36,12 @@ controller = FastAPI(
     },
     openapi_url=f"{settings.API_VERSION_STRING}/openapi.json",
     debug=settings.is_debug,
+    lifespan=lifespan,
 )
 
+# Added before CORS, so that CORS wraps it and its 304s get CORS headers too.
+controller.add_middleware(ResponseCacheMiddleware, cache=response_cache)
+
 if settings.all_cors_origins:
     controller.add_middleware(
         CORSMiddleware,
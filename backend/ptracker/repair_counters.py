@@ -0,0 +1,18 @@
+from sqlmodel import Session
+
+from ptracker.core.counters import repair_counters
+from ptracker.core.db import engine
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def main() -> None:
+    logger.info("Recounting promise, action and citation counters.")
+    with Session(engine) as session:
+        repair_counters(session)
+    logger.info("Finished repairing counters.")
+
+
+if __name__ == "__main__":
+    main()
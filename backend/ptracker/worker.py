@@ -0,0 +1,146 @@
+from sqlmodel import Session
+
+import argparse
+import multiprocessing
+import os
+import socket
+import threading
+import time
+
+from ptracker.api.models import Candidate
+from ptracker.core.db import engine
+from ptracker.core.jobs import (
+    complete_job,
+    count_active_workers,
+    fail_job,
+    lease_extraction_job,
+    record_failed_urls,
+    record_processed_urls,
+    renew_lease,
+    LeaseLost,
+)
+from ptracker.core.llm_utils import embedding_rate_limiter, rate_limiter
+from ptracker.core.settings import settings
+from ptracker.core.sources import analyze_sources, ExtractionDeferred, ExtractionStopped
+from ptracker.core.sources.relevance_filter import RelevanceStats
+from ptracker.core.utils import get_logger
+
+logger = get_logger(__name__)
+
+
+def _rebalance_llm_budget(session: Session) -> None:
+    # The OpenAI quotas are for the whole fleet, so split them evenly between the workers running jobs right now.
+    active_workers = max(count_active_workers(session), 1)
+    if rate_limiter.share != 1 / active_workers:
+        logger.info(f"Taking 1/{active_workers} of the LLM budget, shared with the other running workers.")
+        rate_limiter.set_share(1 / active_workers)
+        embedding_rate_limiter.set_share(1 / active_workers)
+
+
+def _keep_lease_alive(job_id: int, worker_id: str, done: threading.Event, lease_lost: threading.Event) -> None:
+    renew_seconds = settings.JOB_LEASE_SECONDS / 3
+    last_renewed = time.monotonic()
+    while not done.wait(min(renew_seconds, settings.WORKER_REBALANCE_SECONDS)):
+        with Session(engine) as session:
+            if time.monotonic() - last_renewed >= renew_seconds:
+                if not renew_lease(session, job_id, worker_id):
+                    logger.warning(f"Worker {worker_id} lost its lease on extraction job {job_id}.")
+                    # Stops the extraction too, rather than let it spend LLM calls on urls its replacement redoes.
+                    lease_lost.set()
+                    return
+                last_renewed = time.monotonic()
+            _rebalance_llm_budget(session)
+
+
+def run_next_job(worker_id: str) -> bool:
+    with Session(engine) as session:
+        job = lease_extraction_job(session, worker_id)
+        if job is None:
+            return False
+        job_id, urls, processed_urls, attempts = job.id, job.urls, list(job.processed_urls), job.attempts
+        failed_urls = dict(job.failed_urls)
+        relevance_stats = RelevanceStats(chunks=job.chunk_count, skipped=job.skipped_chunk_count)
+        candidate = session.get(Candidate, job.candidate_id)
+        _rebalance_llm_budget(session)
+
+    # Each url is recorded as processed in the same transaction that commits its entities, so a retried job, on
+    # this worker or any other, resumes after the last url that made it into the database without redoing any.
+    # Urls that already failed for good aren't tried again either.
+    already_processed = set(processed_urls).union(failed_urls)
+    remaining_urls = [url for url in urls if url not in already_processed]
+    logger.info(f"Worker {worker_id} leased extraction job {job_id} (attempt {attempts}) with "
+                f"{len(remaining_urls)} of {len(urls)} urls left to process ({len(failed_urls)} failed).")
+
+    def on_url_complete(url_session: Session, url: str, url_relevance_stats: RelevanceStats) -> None:
+        # Raises if another worker took over the job, rolling back this url's entities; that worker redoes it.
+        record_processed_urls(url_session, job_id, worker_id,
+                              processed_urls=processed_urls + [url],
+                              chunk_count=relevance_stats.chunks + url_relevance_stats.chunks,
+                              skipped_chunk_count=relevance_stats.skipped + url_relevance_stats.skipped)
+        processed_urls.append(url)
+        relevance_stats.add(url_relevance_stats)
+
+    def on_url_failed(url_session: Session, url: str, reason: str) -> None:
+        record_failed_urls(url_session, job_id, worker_id, failed_urls={**failed_urls, url: reason})
+        failed_urls[url] = reason
+
+    done = threading.Event()
+    lease_lost = threading.Event()
+    heartbeat = threading.Thread(target=_keep_lease_alive, args=(job_id, worker_id, done, lease_lost), daemon=True)
+    heartbeat.start()
+    try:
+        analyze_sources(candidate, remaining_urls,
+                        on_url_complete=on_url_complete,
+                        on_url_failed=on_url_failed,
+                        stop=lease_lost)
+    except LeaseLost as e:
+        logger.warning(f"{e} Abandoning it to the worker that took it over.")
+    except ExtractionStopped:
+        logger.warning(f"Abandoning extraction job {job_id} to the worker that took it over.")
+    except ExtractionDeferred as e:
+        # Every other url is committed already; the retry picks up the rest once the rate limit has eased.
+        logger.warning(f"{e} Requeueing extraction job {job_id} after attempt {attempts}.")
+        with Session(engine) as session:
+            fail_job(session, job_id, worker_id, attempts=attempts, error=repr(e))
+    except Exception as e:
+        logger.exception(f"Extraction job {job_id} failed on attempt {attempts}.")
+        with Session(engine) as session:
+            fail_job(session, job_id, worker_id, attempts=attempts, error=repr(e))
+    else:
+        with Session(engine) as session:
+            if complete_job(session, job_id, worker_id):
+                logger.info(f"Worker {worker_id} completed extraction job {job_id}.")
+    finally:
+        done.set()
+        heartbeat.join()
+    return True
+
+
+def run_worker() -> None:
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    logger.info(f"Starting extraction worker {worker_id}.")
+    while True:
+        if not run_next_job(worker_id):
+            time.sleep(settings.WORKER_POLL_SECONDS)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run extraction workers that process queued source jobs.")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes to run on this node.")
+    args = parser.parse_args()
+
+    if args.processes == 1:
+        run_worker()
+        return
+
+    # Spawn rather than fork, so that each worker builds its own database engine and HTTP/LLM clients.
+    context = multiprocessing.get_context("spawn")
+    workers = [context.Process(target=run_worker, name=f"worker-{idx}") for idx in range(args.processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+if __name__ == "__main__":
+    main()
@@ -2,4 +2,6 @@
 
 python3 ptracker/seed.py
 
+python3 ptracker/worker.py --processes "${WORKER_PROCESSES:-1}" &
+
 python3 ptracker/main.py
@@ -0,0 +1,79 @@
+import random
+
+from ptracker.core.sources.article_deduplicator import ArticleDeduplicator, KnownArticle
+
+
+def test_check_extracts_new_articles():
+    deduplicator = ArticleDeduplicator(max_distance=3)
+    assert deduplicator.check("https://a.example/story", "text", fingerprint=0b0000)
+    assert deduplicator.check("https://b.example/other", "text", fingerprint=0xFF00)
+    assert deduplicator.duplicates == []
+
+
+def test_check_sets_aside_near_duplicates_of_the_nearest_canonical_article():
+    deduplicator = ArticleDeduplicator(max_distance=3)
+    deduplicator.check("https://a.example/story", "text", fingerprint=0b0000_0000)
+    deduplicator.check("https://b.example/story", "text", fingerprint=0b1111_0000)
+    assert not deduplicator.check("https://c.example/story", "copy", fingerprint=0b1110_0000)
+    [duplicate] = deduplicator.duplicates
+    assert duplicate.url == "https://c.example/story"
+    assert duplicate.text == "copy"
+    assert duplicate.canonical.url == "https://b.example/story"
+
+
+def test_check_does_not_treat_duplicates_as_canonical():
+    deduplicator = ArticleDeduplicator(max_distance=2)
+    deduplicator.check("https://a.example/story", "text", fingerprint=0b0000)
+    deduplicator.check("https://b.example/story", "text", fingerprint=0b0011)
+    # Within 2 bits of the duplicate, but 4 bits from the canonical article.
+    assert deduplicator.check("https://c.example/story", "text", fingerprint=0b1111)
+    assert len(deduplicator.duplicates) == 1
+
+
+def test_check_skips_urls_already_cited_as_duplicates():
+    deduplicator = ArticleDeduplicator(max_distance=3, articles=[
+        KnownArticle(url="https://a.example/story", fingerprint=0b0000, id=1),
+        KnownArticle(url="https://b.example/story", fingerprint=0b0001, id=2, canonical=False),
+    ])
+    assert not deduplicator.check("https://b.example/story", "text", fingerprint=0b0011)
+    assert deduplicator.duplicates == []
+
+
+def test_check_re_extracts_a_canonical_url_and_reindexes_its_fingerprint():
+    deduplicator = ArticleDeduplicator(max_distance=3)
+    deduplicator.check("https://a.example/story", "text", fingerprint=0)
+    assert deduplicator.check("https://a.example/story", "updated text", fingerprint=(1 << 64) - 1)
+    assert deduplicator.articles[0].fingerprint == (1 << 64) - 1
+    # Only near the new fingerprint is now a duplicate.
+    assert deduplicator.check("https://b.example/story", "text", fingerprint=0)
+    assert not deduplicator.check("https://c.example/story", "text", fingerprint=(1 << 64) - 2)
+    assert deduplicator.duplicates[0].canonical.url == "https://a.example/story"
+
+
+def test_check_finds_the_same_canonical_article_as_a_linear_scan():
+    # Random fingerprints, so the band index has to find near neighbors among many unrelated articles.
+    rng = random.Random(0)
+    fingerprints = [rng.getrandbits(64) for _ in range(2000)]
+    deduplicator = ArticleDeduplicator(articles=[KnownArticle(url=f"https://example.com/{idx}", fingerprint=fingerprint)
+                                                 for idx, fingerprint in enumerate(fingerprints)])
+    for idx in range(200):
+        original = rng.randrange(len(fingerprints))
+        fingerprint = fingerprints[original]
+        for _ in range(rng.randint(0, deduplicator.max_distance)):
+            fingerprint ^= 1 << rng.randrange(64)
+        assert not deduplicator.check(f"https://copy.example.com/{idx}", "text", fingerprint=fingerprint)
+        assert deduplicator.duplicates[-1].canonical.url == f"https://example.com/{original}"
+
+
+def test_validators_only_cover_recorded_canonical_articles_of_the_same_extraction_version():
+    deduplicator = ArticleDeduplicator(extraction_version="v2", articles=[
+        KnownArticle(url="https://a.example/", fingerprint=1, id=1, etag='"a"', extraction_version="v2"),
+        KnownArticle(url="https://b.example/", fingerprint=2, id=2, etag='"b"', extraction_version="v1"),
+        KnownArticle(url="https://c.example/", fingerprint=3, etag='"c"', extraction_version="v2"),
+        KnownArticle(url="https://d.example/", fingerprint=4, id=4, last_modified="Tue, 01 Oct 2024 00:00:00 GMT",
+                     extraction_version="v2"),
+    ])
+    assert deduplicator.validators() == {
+        "https://a.example/": ('"a"', None),
+        "https://d.example/": (None, "Tue, 01 Oct 2024 00:00:00 GMT"),
+    }
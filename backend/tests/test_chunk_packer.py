@@ -0,0 +1,46 @@
+from ptracker.core import constants
+from ptracker.core.settings import settings
+from ptracker.core.sources.chunk_packer import ChunkPacker, format_packed_extracts, packed_output_tokens
+
+# Each chunk is 101 tokens by `estimate_tokens`, plus 12 for its wrapper in a packed prompt.
+CHUNKS = ["x" * 400 for _ in range(7)]
+WRAPPED_CHUNK_TOKENS = 113
+
+
+def test_pack_respects_max_chunks():
+    assert ChunkPacker(max_chunks=3).pack(CHUNKS, prompt_tokens=500) == [[0, 1, 2], [3, 4, 5], [6]]
+
+
+def test_pack_of_one_chunk_each_disables_packing():
+    assert ChunkPacker(max_chunks=1).pack(CHUNKS, prompt_tokens=500) == [[idx] for idx in range(7)]
+
+
+def test_pack_fits_the_context_alongside_prompt_and_completion_budget():
+    prompt_tokens = 100
+    context_tokens = prompt_tokens + packed_output_tokens(4) + 2 * WRAPPED_CHUNK_TOKENS
+    packer = ChunkPacker(max_chunks=4, context_tokens=context_tokens)
+    assert packer.pack(CHUNKS, prompt_tokens=prompt_tokens) == [[0, 1], [2, 3], [4, 5], [6]]
+    # One token less and only one chunk fits at a time.
+    packer = ChunkPacker(max_chunks=4, context_tokens=context_tokens - 1)
+    assert packer.pack(CHUNKS, prompt_tokens=prompt_tokens) == [[idx] for idx in range(7)]
+
+
+def test_pack_never_leaves_a_chunk_out():
+    # A chunk too big for any pack still gets one to itself, rather than being dropped.
+    packer = ChunkPacker(max_chunks=4, context_tokens=1000)
+    assert packer.pack(CHUNKS, prompt_tokens=500) == [[idx] for idx in range(7)]
+
+
+def test_max_chunks_is_capped_by_the_completion_budget():
+    assert ChunkPacker(max_chunks=1000).max_chunks == settings.LLM_MAX_OUTPUT_TOKENS // constants.EXTRACTION_MAX_TOKENS
+    assert ChunkPacker(max_chunks=0).max_chunks == 1
+
+
+def test_packed_output_tokens():
+    assert packed_output_tokens(1) == constants.EXTRACTION_MAX_TOKENS
+    assert packed_output_tokens(1000) == settings.LLM_MAX_OUTPUT_TOKENS
+
+
+def test_format_packed_extracts():
+    assert format_packed_extracts(["first", "second"]) == \
+        '<chunk id="0">\nfirst\n</chunk>\n\n<chunk id="1">\nsecond\n</chunk>'
@@ -0,0 +1,75 @@
+from ptracker.core.content_extractor import extract_main_content, normalize_whitespace
+
+ARTICLE_PARAGRAPHS = [
+    "The senator promised on Tuesday to cut taxes for working families, expand rural broadband, and fund new "
+    "bridges across the state, according to a speech delivered in the capital.",
+    "Critics said the plan, which would cost billions, lacked detail on how it would be paid for, though aides "
+    "insisted that savings elsewhere in the budget would cover most of it.",
+    "The proposal will be debated next month, when lawmakers return from recess, and a vote is expected before "
+    "the end of the session.",
+]
+
+PAGE = f"""<!DOCTYPE html>
+<html>
+<head><title>Senator promises tax cuts</title><style>body {{ color: red; }}</style></head>
+<body>
+  <header><a href="/">Home</a> <a href="/politics">Politics</a></header>
+  <nav><ul><li><a href="/a">Section A</a></li><li><a href="/b">Section B</a></li></ul></nav>
+  <div class="main-content">
+    <div class="articleBody">
+      {"".join(f"<p>{paragraph}</p>" for paragraph in ARTICLE_PARAGRAPHS)}
+    </div>
+    <div class="share-buttons"><p>Share this story on every social network you use, right now please.</p></div>
+  </div>
+  <div class="sidebar">
+    <p>Most read: ten things you did not know about the capital, and a few more you did.</p>
+  </div>
+  <script>trackPageView("senator-tax-cuts");</script>
+  <footer><p>Copyright 2024, The Daily Example. All rights reserved, everywhere, forever.</p></footer>
+</body>
+</html>"""
+
+
+def test_extract_main_content_keeps_the_article_body():
+    content, _ = extract_main_content(PAGE)
+    assert content.split("\n\n") == ARTICLE_PARAGRAPHS
+
+
+def test_extract_main_content_removes_boilerplate():
+    content, report = extract_main_content(PAGE)
+    for boilerplate in ("Section A", "Share this story", "Most read", "trackPageView", "Copyright", "color: red"):
+        assert boilerplate not in content
+    assert 0 < report.content_tokens < report.page_tokens
+    assert 0 < report.savings < 1
+
+
+def test_extract_main_content_prefers_positive_class_hints():
+    paragraph = "A long enough paragraph, with a comma, to count as a vote for its parent element."
+    # The first div holds more paragraphs, but the story's id outweighs them.
+    page = f"""<html><body>
+      <div class="extras">{f"<p>{paragraph}</p>" * 3}</div>
+      <div id="story"><p>{paragraph}</p></div>
+    </body></html>"""
+    content, _ = extract_main_content(page)
+    assert content == paragraph
+
+
+def test_extract_main_content_without_paragraphs_falls_back_to_the_body_text():
+    content, _ = extract_main_content("<html><body><div>Short</div><div>notes</div></body></html>")
+    assert content == "Short\n\nnotes"
+
+
+def test_extract_main_content_accepts_xml_declarations():
+    page = '<?xml version="1.0" encoding="utf-8"?><html><body><p>' + ARTICLE_PARAGRAPHS[0] + "</p></body></html>"
+    content, _ = extract_main_content(page)
+    assert content == ARTICLE_PARAGRAPHS[0]
+
+
+def test_extract_main_content_of_an_empty_page():
+    content, report = extract_main_content("")
+    assert content == ""
+    assert report.savings == 0.0
+
+
+def test_normalize_whitespace():
+    assert normalize_whitespace("  a \t b c \n\n\n\n d \n e  ") == "a b c\n\nd\ne"
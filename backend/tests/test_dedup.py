@@ -0,0 +1,93 @@
+import numpy as np
+
+from ptracker.core.dedup import (
+    cluster_by_similarity,
+    deduplicate_by_embedding,
+    hamming_distance,
+    simhash,
+    simhash_bands,
+)
+
+STORY = ("The senator promised on Tuesday to cut taxes for working families and to expand rural broadband, "
+         "saying the plan would be paid for by closing loopholes. Critics said the proposal lacked detail, "
+         "and a vote is expected next month when lawmakers return from their summer recess.")
+
+
+def test_cluster_by_similarity_does_not_chain():
+    # Each neighbor is within 0.7 of the next, but [1, 0] and [0, 1] are orthogonal.
+    chain = [[1, 0], [0.8, 0.6], [0.28, 0.96], [0, 1]]
+    assert cluster_by_similarity(chain, 0.7) == [[0, 1], [2, 3]]
+    assert cluster_by_similarity(chain, 0.7, block_size=1) == [[0, 1], [2, 3]]
+
+
+def test_deduplicate_by_embedding_keeps_dissimilar_entities():
+    entity_jsons = [
+        {"text": "Cut taxes", "embedding": [1, 0]},
+        {"text": "Cut taxes for families", "embedding": [0.8, 0.6]},
+        {"text": "Build housing", "embedding": [0.28, 0.96]},
+        {"text": "Build more housing", "embedding": [0, 1]},
+    ]
+    assert [entity_json["text"] for entity_json in deduplicate_by_embedding(entity_jsons)] == [
+        "Cut taxes for families",
+        "Build more housing",
+    ]
+
+
+def test_cluster_by_similarity_ignores_input_order():
+    rng = np.random.default_rng(0)
+    embeddings = rng.normal(size=(300, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    clusters = {frozenset(cluster) for cluster in cluster_by_similarity(embeddings, 0.8, block_size=64)}
+
+    permutation = rng.permutation(len(embeddings))
+    permuted_clusters = {
+        frozenset(int(permutation[idx]) for idx in cluster)
+        for cluster in cluster_by_similarity(embeddings[permutation], 0.8, block_size=64)
+    }
+    assert permuted_clusters == clusters
+    assert any(len(cluster) > 1 for cluster in clusters)
+
+
+def test_cluster_by_similarity_keeps_every_pair_within_threshold():
+    rng = np.random.default_rng(1)
+    embeddings = rng.normal(size=(300, 8)).astype(np.float32)
+    embeddings /= np.linalg.norm(embeddings, axis=1, keepdims=True)
+    for cluster in cluster_by_similarity(embeddings, 0.8, block_size=64):
+        assert (embeddings[cluster] @ embeddings[cluster].T).min() >= 0.8
+
+
+def test_simhash_is_64_bits_and_ignores_case_and_punctuation():
+    fingerprint = simhash(STORY)
+    assert 0 <= fingerprint < 1 << 64
+    assert simhash(STORY.upper().replace(",", "")) == fingerprint
+
+
+def test_simhash_of_near_duplicates_is_close():
+    syndicated = "By a staff writer. " + STORY.replace("Tuesday", "Wednesday")
+    unrelated = ("The stadium, built in 1994, will close for renovations this winter, and the team will play its home "
+                 "games at a temporary venue across town until the work is finished late next year.")
+    assert hamming_distance(simhash(STORY), simhash(syndicated)) <= 8
+    assert hamming_distance(simhash(STORY), simhash(unrelated)) > 8
+
+
+def test_hamming_distance():
+    assert hamming_distance(0, 0) == 0
+    assert hamming_distance(0b1011, 0b0001) == 2
+    assert hamming_distance(0, (1 << 64) - 1) == 64
+
+
+def test_simhash_bands_cover_all_64_bits():
+    bands = simhash_bands((1 << 64) - 1, max_distance=8)
+    assert len(bands) == 9
+    assert sum(band.bit_length() for band in bands) == 64
+
+
+def test_simhash_bands_share_a_band_within_max_distance():
+    rng = np.random.default_rng(2)
+    for _ in range(200):
+        fingerprint = int.from_bytes(rng.bytes(8), "little")
+        flipped = fingerprint
+        for bit in rng.choice(64, size=8, replace=False):
+            flipped ^= 1 << int(bit)
+        assert hamming_distance(fingerprint, flipped) == 8
+        assert any(a == b for a, b in zip(simhash_bands(fingerprint, 8), simhash_bands(flipped, 8)))
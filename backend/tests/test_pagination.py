@@ -0,0 +1,85 @@
+from fastapi import HTTPException
+from sqlmodel import create_engine, func, select, Field, Session, SQLModel
+
+import base64
+import pytest
+
+from ptracker.api.pagination import decode_cursor, encode_cursor, paginate
+
+
+class PageItem(SQLModel, table=True):
+    id: int = Field(default=None, primary_key=True)
+    name: str
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    PageItem.__table__.create(engine)
+    with Session(engine) as session:
+        session.add_all(PageItem(id=idx, name=f"item {idx}") for idx in range(1, 8))
+        session.commit()
+        yield session
+
+
+def _paginate(session: Session, **kwargs):
+    count_query = select(func.count()).select_from(PageItem)
+    return paginate(session, select(PageItem, count_query.scalar_subquery()), count_query, key=PageItem.id, **kwargs)
+
+
+def test_cursor_round_trip():
+    cursor = encode_cursor(12345)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == 12345
+
+
+@pytest.mark.parametrize("cursor", [
+    "not a cursor!",
+    "",
+    encode_cursor("12"),  # A string id.
+    base64.urlsafe_b64encode(b'{"after": 12}').decode(),
+    base64.urlsafe_b64encode(b"[12]").decode(),
+])
+def test_decode_cursor_rejects_malformed_cursors(cursor):
+    with pytest.raises(HTTPException) as excinfo:
+        decode_cursor(cursor)
+    assert excinfo.value.status_code == 400
+
+
+def test_paginate_follows_cursors_to_the_last_page(session):
+    pages = []
+    items, count, cursor = _paginate(session, limit=3)
+    pages.append([item.id for item in items])
+    while cursor is not None:
+        items, count, cursor = _paginate(session, limit=3, cursor=cursor)
+        pages.append([item.id for item in items])
+    assert pages == [[1, 2, 3], [4, 5, 6], [7]]
+    assert count == 7
+
+
+def test_paginate_has_no_cursor_when_the_page_is_exactly_the_rest(session):
+    items, count, cursor = _paginate(session, limit=7)
+    assert [item.id for item in items] == list(range(1, 8))
+    assert count == 7
+    assert cursor is None
+
+
+def test_paginate_with_an_offset(session):
+    items, count, cursor = _paginate(session, after=5, limit=3)
+    assert [item.id for item in items] == [6, 7]
+    assert count == 7
+    assert cursor is None
+
+
+def test_paginate_past_the_end_still_counts(session):
+    items, count, cursor = _paginate(session, after=10)
+    assert items == []
+    assert count == 7
+    assert cursor is None
+
+
+def test_paginate_with_a_zero_limit(session):
+    items, count, cursor = _paginate(session, limit=0)
+    assert items == []
+    assert count == 7
+    assert cursor is None
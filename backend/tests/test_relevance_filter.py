@@ -0,0 +1,64 @@
+from ptracker.core.sources.relevance_filter import (
+    NAME_SCORE,
+    PRONOUN_SCORE,
+    SURNAME_SCORE,
+    RelevanceFilter,
+    RelevanceStats,
+)
+
+CHUNKS = [
+    "The weather was mild across the state on Monday.",
+    "Kamala D. Harris spoke to reporters after the rally.",
+    "She said the plan would lower costs for families.",
+    "Harris added that the vote would come next month.",
+    "The stadium was built in 1994 and seats 40,000.",
+    "They expect the stadium to be renovated soon.",
+]
+
+
+def test_score_levels():
+    relevance_filter = RelevanceFilter("Kamala D. Harris")
+    assert relevance_filter.score("kamala d. harris said", chunks_since_mention=None) == NAME_SCORE
+    assert relevance_filter.score("Kamala Harris said", chunks_since_mention=None) == NAME_SCORE
+    assert relevance_filter.score("Harris said", chunks_since_mention=None) == SURNAME_SCORE
+    assert relevance_filter.score("She said", chunks_since_mention=1) == PRONOUN_SCORE
+    assert relevance_filter.score("She said", chunks_since_mention=None) == 0.0
+    assert relevance_filter.score("Harrison said", chunks_since_mention=None) == 0.0
+
+
+def test_filter_at_full_recall_keeps_every_chunk():
+    kept, stats = RelevanceFilter("Kamala D. Harris", recall=1.0).filter(CHUNKS)
+    assert kept == list(range(len(CHUNKS)))
+    assert stats == RelevanceStats(chunks=len(CHUNKS), skipped=0)
+
+
+def test_filter_keeps_pronouns_only_shortly_after_a_mention():
+    kept, stats = RelevanceFilter("Kamala D. Harris", recall=0.9, pronoun_window=1).filter(CHUNKS)
+    # "She" directly follows a mention; the last chunk's "They" is two chunks after "Harris", outside the window.
+    assert kept == [1, 2, 3]
+    assert stats == RelevanceStats(chunks=6, skipped=3)
+    assert RelevanceFilter("Kamala D. Harris", recall=0.9, pronoun_window=2).filter(CHUNKS)[0] == [1, 2, 3, 5]
+
+
+def test_filter_at_low_recall_keeps_only_named_chunks():
+    assert RelevanceFilter("Kamala D. Harris", recall=0.4).filter(CHUNKS)[0] == [1, 3]
+    assert RelevanceFilter("Kamala D. Harris", recall=0.2).filter(CHUNKS)[0] == [1]
+
+
+def test_filter_matches_aliases_as_full_names():
+    chunks = ["The Vice President toured the plant.", "Nobody else was there."]
+    assert RelevanceFilter("Kamala D. Harris", recall=0.2).filter(chunks)[0] == []
+    assert RelevanceFilter("Kamala D. Harris", aliases=["the Vice President"], recall=0.2).filter(chunks)[0] == [0]
+
+
+def test_filter_ignores_name_suffixes_and_single_letter_surnames():
+    relevance_filter = RelevanceFilter("Martin Luther King, Jr.", recall=0.2)
+    assert relevance_filter.score("Martin Luther King spoke", chunks_since_mention=None) == NAME_SCORE
+    assert relevance_filter.score("King spoke", chunks_since_mention=None) == SURNAME_SCORE
+    assert RelevanceFilter("Harris J").surname_pattern is None
+
+
+def test_relevance_stats_add():
+    stats = RelevanceStats(chunks=3, skipped=1)
+    stats.add(RelevanceStats(chunks=4, skipped=2))
+    assert stats == RelevanceStats(chunks=7, skipped=3)
@@ -0,0 +1,132 @@
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import pytest
+
+from ptracker.api import response_cache as response_cache_module
+from ptracker.api.response_cache import CachedResponse, ResponseCache, ResponseCacheMiddleware
+from ptracker.core.settings import settings
+
+PREFIX = settings.API_VERSION_STRING
+
+
+def _entry(version: tuple[int, int], body: bytes = b"body") -> CachedResponse:
+    return CachedResponse(version=version, body=body, content_type="application/json", etag='"etag"')
+
+
+def test_get_misses_on_a_stale_version():
+    cache = ResponseCache()
+    cache.set("/candidates/1", _entry(cache.version(1)))
+    assert cache.get("/candidates/1", cache.version(1)) is not None
+    cache.invalidate(1)
+    assert cache.get("/candidates/1", cache.version(1)) is None
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_invalidating_a_candidate_retires_the_candidate_list_but_not_other_candidates():
+    cache = ResponseCache()
+    list_version, other_version = cache.version(None), cache.version(2)
+    cache.invalidate(1)
+    assert cache.version(None) != list_version
+    assert cache.version(2) == other_version
+
+
+def test_invalidating_everything_drops_entries_and_refuses_responses_rendered_before():
+    cache = ResponseCache()
+    stale_version = cache.version(1)
+    cache.set("/candidates/1", _entry(stale_version))
+    cache.invalidate(None)
+    assert cache.stats()["entries"] == 0
+    cache.set("/candidates/1", _entry(stale_version))
+    assert cache.stats()["entries"] == 0
+
+
+def test_set_evicts_least_recently_used_entries_beyond_max_bytes():
+    cache = ResponseCache(max_bytes=10)
+    version = cache.version(None)
+    cache.set("a", _entry(version, b"1234"))
+    cache.set("b", _entry(version, b"1234"))
+    cache.get("a", version)
+    cache.set("c", _entry(version, b"1234"))
+    assert cache.get("b", version) is None
+    assert cache.get("a", version) is not None
+    assert cache.stats()["evictions"] == 1
+    cache.set("d", _entry(version, b"x" * 11))  # Larger than the whole cache.
+    assert cache.get("d", version) is None
+
+
+@pytest.fixture
+def published_changes(monkeypatch):
+    # Stands in for the Postgres notification that reaches other API processes.
+    changes = []
+    monkeypatch.setattr(response_cache_module, "_publish_change", changes.append)
+    return changes
+
+
+@pytest.fixture
+def client():
+    app = FastAPI()
+    calls = {"count": 0}
+
+    @app.get(PREFIX + "/candidates/{candidate_id}")
+    def read_candidate(candidate_id: int):
+        calls["count"] += 1
+        return {"id": candidate_id, "calls": calls["count"]}
+
+    @app.patch(PREFIX + "/candidates/{candidate_id}")
+    def update_candidate(candidate_id: int):
+        return {"id": candidate_id}
+
+    @app.get(PREFIX + "/candidates/{candidate_id}/sources/jobs/{job_id}")
+    def read_job(candidate_id: int, job_id: int):
+        calls["count"] += 1
+        return {"id": job_id, "calls": calls["count"]}
+
+    app.add_middleware(ResponseCacheMiddleware, cache=ResponseCache())
+    return TestClient(app)
+
+
+def test_repeated_reads_are_served_from_the_cache(client):
+    first = client.get(PREFIX + "/candidates/1")
+    second = client.get(PREFIX + "/candidates/1")
+    assert first.json() == second.json() == {"id": 1, "calls": 1}
+    assert first.headers["ETag"] == second.headers["ETag"]
+    assert first.headers["Cache-Control"] == "no-cache"
+
+
+def test_matching_etag_gets_a_304_without_a_body(client):
+    etag = client.get(PREFIX + "/candidates/1").headers["ETag"]
+    for if_none_match in (etag, f'"other", {etag}', "*"):
+        response = client.get(PREFIX + "/candidates/1", headers={"If-None-Match": if_none_match})
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["ETag"] == etag
+    response = client.get(PREFIX + "/candidates/1", headers={"If-None-Match": '"other"'})
+    assert response.status_code == 200
+
+
+def test_writes_invalidate_and_publish_their_candidate(client, published_changes):
+    etag = client.get(PREFIX + "/candidates/1").headers["ETag"]
+    client.get(PREFIX + "/candidates/2")
+    assert client.patch(PREFIX + "/candidates/1").status_code == 200
+    assert published_changes == [1]
+
+    response = client.get(PREFIX + "/candidates/1", headers={"If-None-Match": etag})
+    assert response.status_code == 200
+    assert response.json() == {"id": 1, "calls": 3}
+    assert response.headers["ETag"] != etag
+    assert client.get(PREFIX + "/candidates/2").json() == {"id": 2, "calls": 2}
+
+
+def test_failed_writes_do_not_invalidate(client, published_changes):
+    client.get(PREFIX + "/candidates/1")
+    assert client.patch(PREFIX + "/candidates/not-an-id").status_code == 422
+    assert published_changes == []
+    assert client.get(PREFIX + "/candidates/1").json() == {"id": 1, "calls": 1}
+
+
+def test_job_routes_are_never_cached(client):
+    assert client.get(PREFIX + "/candidates/1/sources/jobs/5").json()["calls"] == 1
+    response = client.get(PREFIX + "/candidates/1/sources/jobs/5")
+    assert response.json()["calls"] == 2
+    assert "ETag" not in response.headers
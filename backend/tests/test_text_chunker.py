@@ -0,0 +1,53 @@
+from ptracker.core.sources.text_chunker import TextChunker
+from ptracker.core.utils import estimate_tokens
+
+# Each sentence is 27 characters, i.e. 7 tokens by `estimate_tokens`.
+SENTENCES = [f"Sentence number {idx:02} is here." for idx in range(10)]
+TEXT = " ".join(SENTENCES)
+
+
+def test_chunk_keeps_whole_sentences_within_max_tokens():
+    chunks, stats = TextChunker(max_tokens=20, overlap_tokens=0).chunk(TEXT)
+    assert chunks == [" ".join(SENTENCES[idx:idx + 2]) for idx in range(0, 10, 2)]
+    assert all(estimate_tokens(chunk) <= 20 for chunk in chunks)
+    assert stats.chunks == 5
+    assert stats.text_tokens == estimate_tokens(TEXT)
+
+
+def test_chunk_repeats_trailing_sentences_as_overlap():
+    chunks, stats = TextChunker(max_tokens=20, overlap_tokens=8).chunk(TEXT)
+    assert chunks == [" ".join(SENTENCES[idx:idx + 2]) for idx in range(9)]
+    assert stats.chunk_tokens > stats.text_tokens
+
+
+def test_chunk_overlap_never_repeats_a_whole_chunk():
+    # The overlap budget fits both sentences of the previous chunk, but the next chunk must still move forward.
+    chunks, _ = TextChunker(max_tokens=20, overlap_tokens=19).chunk(TEXT)
+    assert chunks == [" ".join(SENTENCES[idx:idx + 2]) for idx in range(9)]
+
+
+def test_chunk_splits_on_paragraph_breaks_without_punctuation():
+    text = "A headline without a full stop\n\nThe article body starts here."
+    chunks, _ = TextChunker(max_tokens=8, overlap_tokens=0).chunk(text)
+    assert chunks == ["A headline without a full stop", "The article body starts here."]
+
+
+def test_chunk_cuts_overlong_sentences_on_word_boundaries():
+    text = " ".join(["word"] * 100) + "."
+    chunks, _ = TextChunker(max_tokens=10, overlap_tokens=0).chunk(text)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 40 for chunk in chunks)
+    assert all(set(chunk.rstrip(".").split(" ")) == {"word"} for chunk in chunks)
+
+
+def test_chunks_are_verbatim_slices_of_the_text():
+    text = "He said: \"We will cut taxes.\"  Then he left!\n\nLater, (quietly) he returned?  Yes."
+    chunks, _ = TextChunker(max_tokens=8, overlap_tokens=4).chunk(text)
+    assert chunks
+    assert all(chunk in text for chunk in chunks)
+
+
+def test_chunk_of_empty_text():
+    chunks, stats = TextChunker().chunk("   \n\n  ")
+    assert chunks == []
+    assert stats.chunks == 0